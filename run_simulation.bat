@@ -65,7 +65,7 @@ echo ==========================================
 echo.
 echo Results saved to:
 echo   - docs\assets\       (graphs)
-echo   - data\              (CSV files)
+echo   - data\              (parquet result tables)
 echo.
 echo To view the website:
 echo   1. Open docs\index.html in your browser
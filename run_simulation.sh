@@ -60,7 +60,7 @@ if [ $? -eq 0 ]; then
     echo ""
     echo "Results saved to:"
     echo "  - docs/assets/       (graphs)"
-    echo "  - data/              (CSV files)"
+    echo "  - data/              (parquet result tables)"
     echo ""
     echo "To view the website:"
     echo "  1. Open docs/index.html in your browser"
@@ -2,9 +2,9 @@
 """
 Defines the actors in the simulation: General Contractors, Prefab Units, and Tenants.
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import List
+from typing import Callable, List
 import random
 
 class MarketType(Enum):
@@ -20,7 +20,14 @@ class RiskType(Enum):
     SCHEDULE_DELAY = "schedule_delay"
     NONE = "none"
 
-@dataclass
+# Relative likelihood of each risk type, given that a risk event occurred
+RISK_TYPE_WEIGHTS = {
+    RiskType.CONSTRUCTION_DEFECT: 0.4,
+    RiskType.UTILITY_FAILURE: 0.4,
+    RiskType.SCHEDULE_DELAY: 0.2
+}
+
+@dataclass(slots=True)
 class GeneralContractor:
     """
     Represents one of the 12 General Contractors installing prefab homes.
@@ -32,6 +39,8 @@ class GeneralContractor:
     current_jobs: int = 0
     max_concurrent_jobs: int = 3
     completed_jobs: int = 0
+    # Called with this GC whenever its job count changes (e.g. availability indexes)
+    listeners: List[Callable] = field(default_factory=list, repr=False, compare=False)
     
     def is_available(self) -> bool:
         """Check if GC can take on another job."""
@@ -41,6 +50,7 @@ class GeneralContractor:
         """Assign a new job to this GC."""
         if self.is_available():
             self.current_jobs += 1
+            self._notify()
             return True
         return False
     
@@ -49,13 +59,20 @@ class GeneralContractor:
         if self.current_jobs > 0:
             self.current_jobs -= 1
             self.completed_jobs += 1
+            self._notify()
     
-    def calculate_risk_probability(self, market: MarketType) -> float:
+    def _notify(self):
+        for listener in self.listeners:
+            listener(self)
+    
+    def calculate_risk_probability(self, market: MarketType, base_risk: float = 0.15) -> float:
         """
         Calculate the probability of a risk event based on GC skill and market match.
         Returns a probability between 0.0 and 1.0.
+        
+        :param base_risk: Risk before skill and specialization (default 15%; the
+                          market's total from the risk tables for table-driven runs)
         """
-        base_risk = 0.15  # 15% base risk
         
         # Skill reduces risk
         skill_modifier = (1.0 - self.skill_level) * 0.1
@@ -65,22 +82,20 @@ class GeneralContractor:
         
         return min(0.3, base_risk + skill_modifier + specialization_modifier)
 
-@dataclass
+@dataclass(slots=True)
 class PrefabUnit:
     """
     Represents a prefab housing unit to be installed.
+    Slotted, with the risk event list only allocated once a risk event occurs,
+    to keep per-unit memory small in large simulations.
     """
-    id: int
+    id: int  # Unique within a run: market code * units per market + sequence number
     market_type: MarketType
     asset_value: float
     installation_time_days: int
     assigned_gc: GeneralContractor = None
     installation_complete: bool = False
-    risk_events: List[RiskType] = None
-    
-    def __post_init__(self):
-        if self.risk_events is None:
-            self.risk_events = []
+    risk_events: List[RiskType] = None  # None until the first risk event
     
     def assign_contractor(self, gc: GeneralContractor) -> bool:
         """Assign a GC to this unit."""
@@ -101,15 +116,12 @@ class PrefabUnit:
         
         if random.random() < risk_prob:
             # Determine which type of risk occurred
-            risk_weights = {
-                RiskType.CONSTRUCTION_DEFECT: 0.4,
-                RiskType.UTILITY_FAILURE: 0.4,
-                RiskType.SCHEDULE_DELAY: 0.2
-            }
             risk_event = random.choices(
-                list(risk_weights.keys()),
-                weights=list(risk_weights.values())
+                list(RISK_TYPE_WEIGHTS.keys()),
+                weights=list(RISK_TYPE_WEIGHTS.values())
             )[0]
+            if self.risk_events is None:
+                self.risk_events = []
             self.risk_events.append(risk_event)
             return risk_event
         
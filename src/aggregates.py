@@ -0,0 +1,314 @@
+#!/usr/bin/env python3.10
+"""
+Running aggregates for streamed Monte Carlo results.
+Lets the risk model fold simulations in chunk by chunk without keeping every path.
+"""
+import math
+import numpy as np
+from typing import Dict, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported where used: the numeric core does not need it
+
+def merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b) -> Tuple:
+    """
+    Combine two sets of (count, mean, sum of squared deviations) moments.
+    Works element-wise on NumPy arrays (Chan et al. parallel variance).
+    """
+    count = count_a + count_b
+    if np.all(count == 0):
+        return count, mean_a, m2_a
+    delta = mean_b - mean_a
+    safe_count = np.where(count == 0, 1, count)
+    mean = mean_a + delta * count_b / safe_count
+    m2 = m2_a + m2_b + delta ** 2 * count_a * count_b / safe_count
+    return count, mean, m2
+
+def paths_to_frame(paths: Dict[str, np.ndarray], first_simulation: int = 0) -> 'pd.DataFrame':
+    """
+    Flatten (simulations, years) path arrays into the run_monte_carlo DataFrame layout.
+
+    :param paths: Dictionary of arrays from CaptiveInsuranceModel._simulate_paths
+    :param first_simulation: Simulation number of the first row of the arrays
+    :return: DataFrame with one row per simulation-year
+    """
+    import pandas as pd
+    num_simulations, years = paths['ending_capital'].shape
+    columns = {
+        'simulation': np.repeat(np.arange(first_simulation, first_simulation + num_simulations), years),
+        'year': np.tile(np.arange(years), num_simulations)
+    }
+    for key, values in paths.items():
+        columns[key] = values.reshape(-1)
+    return pd.DataFrame(columns)
+
+def frame_to_paths(results_df: 'pd.DataFrame') -> Dict[str, np.ndarray]:
+    """
+    Reshape a run_monte_carlo DataFrame into (simulations, years) path arrays, the
+    inverse of paths_to_frame, so per-simulation results (the final year, whether
+    the path was ever ruined) are plain array slices instead of groupbys.
+
+    :param results_df: DataFrame with one row per simulation-year
+    :return: Dictionary of (simulations, years) arrays, one per column besides
+             'simulation' and 'year'
+    """
+    simulation = results_df['simulation'].to_numpy()
+    year = results_df['year'].to_numpy()
+    years = int(year.max()) + 1 if len(year) else 0
+    key = simulation * years + year
+    order = None if (np.diff(key) > 0).all() else np.lexsort((year, simulation))
+    if order is not None:
+        year = year[order]
+    if years == 0 or len(year) % years or (year.reshape(-1, years) != np.arange(years)).any():
+        raise ValueError("Every simulation needs exactly one row per year")
+
+    paths = {}
+    for column in results_df.columns.drop(['simulation', 'year']):
+        values = results_df[column].to_numpy()
+        paths[column] = (values if order is None else values[order]).reshape(-1, years)
+    return paths
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with bounded relative error (DDSketch-style).
+
+    Values are counted in logarithmically sized buckets, so memory depends on the
+    range of the data rather than on the number of values added.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005, min_value: float = 1e-6):
+        """
+        :param relative_accuracy: Maximum relative error of returned quantiles
+        :param min_value: Magnitudes below this are counted as zero
+        """
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        self.positive = {}  # bucket index -> count
+        self.negative = {}  # bucket index (of |x|) -> count
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _add_buckets(self, store: Dict[int, int], magnitudes: np.ndarray):
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        for key, count in zip(*np.unique(keys, return_counts=True)):
+            store[int(key)] = store.get(int(key), 0) + int(count)
+
+    def update(self, values: np.ndarray):
+        """Add an array of values to the sketch."""
+        values = np.asarray(values, dtype=float).reshape(-1)
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        self._add_buckets(self.positive, values[values >= self.min_value])
+        self._add_buckets(self.negative, -values[values <= -self.min_value])
+        self.zero_count += int((np.abs(values) < self.min_value).sum())
+
+    def merge(self, other: 'QuantileSketch'):
+        """Fold another sketch (built with the same accuracy) into this one."""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _bucket_value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def distribution(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Bucket values (clipped to the observed range) in ascending order, with their counts.
+
+        :return: Tuple of (values, counts) arrays
+        """
+        negative = sorted(self.negative, reverse=True)
+        positive = sorted(self.positive)
+        values = np.concatenate([-self._bucket_value(np.array(negative, dtype=float)), [0.0],
+                                 self._bucket_value(np.array(positive, dtype=float))])
+        counts = np.array([self.negative[key] for key in negative] + [self.zero_count] +
+                          [self.positive[key] for key in positive], dtype=float)
+        return np.clip(values, self.min, self.max) if self.count else values, counts
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate the q-th quantile (0 <= q <= 1).
+
+        :return: Quantile estimate, or NaN if the sketch is empty
+        """
+        if self.count == 0:
+            return math.nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        seen = 0
+
+        # Most negative values first, then zeros, then positives ascending
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(self.min, -self._bucket_value(key))
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self.max, self._bucket_value(key))
+        return self.max
+
+class MonteCarloSummary:
+    """
+    Running aggregates of a Monte Carlo run, built one chunk of paths at a time.
+
+    Holds ruin counts, per-year solvency ratio moments, final capital moments,
+    sketched tail-risk metrics (risk_metrics.RiskMetrics) for final capital and annual
+    claims, plus the full paths of a small sample of simulations.
+    """
+
+    def __init__(self, years: int, sample_paths: int = 20, relative_accuracy: float = 0.005):
+        """
+        :param years: Number of years per simulation
+        :param sample_paths: Number of full paths to keep (for trajectory plots)
+        :param relative_accuracy: Relative accuracy of the final capital and claims sketches
+        """
+        import pandas as pd
+        from risk_metrics import RiskMetrics  # imports this module
+        self.years = years
+        self.sample_paths = sample_paths
+        self.num_simulations = 0
+        self.ruin_count = 0
+        self.ruin_year_counts = np.zeros(years, dtype=np.int64)
+
+        # Per-year solvency ratio moments
+        self.solvency_count = np.zeros(years)
+        self.solvency_mean = np.zeros(years)
+        self.solvency_m2 = np.zeros(years)
+
+        # Final capital moments and distribution
+        self.final_capital_mean = 0.0
+        self.final_capital_m2 = 0.0
+        self.risk_metrics = RiskMetrics(exact=False, relative_accuracy=relative_accuracy)
+
+        self.sample_frame = pd.DataFrame()
+        self.num_sampled = 0
+
+    def update(self, paths: Dict[str, np.ndarray], first_simulation: int = 0):
+        """
+        Fold a chunk of simulated paths into the aggregates.
+
+        :param paths: Dictionary of (simulations, years) arrays from the risk model
+        :param first_simulation: Simulation number of the first row of the chunk
+        """
+        ending_capital = paths['ending_capital']
+        count = ending_capital.shape[0]
+        if count == 0:
+            return
+        final_capital = ending_capital[:, -1]
+
+        # First-passage ruin: the first year each path's capital reached zero
+        insolvent = ending_capital <= 0
+        ruined = insolvent.any(axis=1)
+        self.ruin_count += int(ruined.sum())
+        self.ruin_year_counts += np.bincount(insolvent[ruined].argmax(axis=1), minlength=self.years)
+
+        solvency = paths['solvency_ratio']
+        chunk_mean = solvency.mean(axis=0)
+        chunk_m2 = ((solvency - chunk_mean) ** 2).sum(axis=0)
+        self.solvency_count, self.solvency_mean, self.solvency_m2 = merge_moments(
+            self.solvency_count, self.solvency_mean, self.solvency_m2,
+            count, chunk_mean, chunk_m2
+        )
+
+        chunk_mean = final_capital.mean()
+        chunk_m2 = ((final_capital - chunk_mean) ** 2).sum()
+        _, self.final_capital_mean, self.final_capital_m2 = merge_moments(
+            self.num_simulations, self.final_capital_mean, self.final_capital_m2,
+            count, chunk_mean, chunk_m2
+        )
+        self.risk_metrics.update(paths)
+
+        # Keep the lowest-numbered simulations as sample paths
+        missing = self.sample_paths - self.num_sampled
+        if missing > 0:
+            sample = {key: values[:missing] for key, values in paths.items()}
+            self._add_samples(paths_to_frame(sample, first_simulation))
+
+        self.num_simulations += count
+
+    def merge(self, other: 'MonteCarloSummary'):
+        """Fold another summary (from a later block of simulations) into this one."""
+        self.ruin_count += other.ruin_count
+        self.ruin_year_counts += other.ruin_year_counts
+        self.solvency_count, self.solvency_mean, self.solvency_m2 = merge_moments(
+            self.solvency_count, self.solvency_mean, self.solvency_m2,
+            other.solvency_count, other.solvency_mean, other.solvency_m2
+        )
+        _, self.final_capital_mean, self.final_capital_m2 = merge_moments(
+            self.num_simulations, self.final_capital_mean, self.final_capital_m2,
+            other.num_simulations, other.final_capital_mean, other.final_capital_m2
+        )
+        self.risk_metrics.merge(other.risk_metrics)
+
+        missing = self.sample_paths - self.num_sampled
+        if missing > 0 and other.num_sampled:
+            keep = other.sample_frame['simulation'].unique()[:missing]
+            self._add_samples(other.sample_frame[other.sample_frame['simulation'].isin(keep)])
+
+        self.num_simulations += other.num_simulations
+
+    def _add_samples(self, frame: 'pd.DataFrame'):
+        import pandas as pd
+        self.sample_frame = pd.concat([self.sample_frame, frame], ignore_index=True)
+        self.num_sampled = self.sample_frame['simulation'].nunique()
+
+    @property
+    def final_capital_sketch(self) -> QuantileSketch:
+        return self.risk_metrics.sketches['final_capital']
+
+    @property
+    def ruin_probability(self) -> float:
+        return self.ruin_count / self.num_simulations if self.num_simulations else 0.0
+
+    def time_to_ruin(self) -> 'pd.Series':
+        """
+        Probability of first ruin in each year (first-passage distribution).
+        Sums to the overall ruin probability.
+        """
+        import pandas as pd
+        total = self.num_simulations if self.num_simulations else 1
+        return pd.Series(self.ruin_year_counts / total,
+                         index=pd.Index(np.arange(self.years), name='year'),
+                         name='ruin_probability')
+
+    def solvency_by_year(self) -> 'pd.DataFrame':
+        """
+        Mean and sample standard deviation of the solvency ratio for each year.
+        Same layout as results_df.groupby('year')['solvency_ratio'].agg(['mean', 'std']).
+        """
+        import pandas as pd
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.solvency_m2 / (self.solvency_count - 1))
+        return pd.DataFrame(
+            {'mean': self.solvency_mean, 'std': std},
+            index=pd.Index(np.arange(self.years), name='year')
+        )
+
+    def final_capital_std(self) -> float:
+        """Sample standard deviation of final capital."""
+        if self.num_simulations < 2:
+            return math.nan
+        return math.sqrt(self.final_capital_m2 / (self.num_simulations - 1))
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3.10
+"""
+Benchmark harness for the simulation hot paths.
+Times each benchmark, reports latency and throughput as JSON, and compares the results
+against a stored baseline, failing when a hot path slows down past its threshold.
+
+Usage:
+    python benchmark.py                         # run all, compare with ../benchmarks/baseline.json
+    python benchmark.py --filter queue          # only benchmarks whose name contains 'queue'
+    python benchmark.py --output results.json   # also write the results
+    python benchmark.py --update-baseline       # store these results as the new baseline
+"""
+import io
+import os
+import sys
+import json
+import time
+import atexit
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import statistics
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BASELINE_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                             '..', 'benchmarks', 'baseline.json'))
+
+# Allowed slowdown relative to the baseline before a benchmark counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# Looser limit for millisecond-scale benchmarks, whose timings are noisier
+SHORT_THRESHOLD = 0.5
+
+# Benchmark name -> (setup, units of work per call, unit label, threshold override).
+# setup() does any untimed preparation and returns the callable to time.
+BENCHMARKS = {}
+
+def benchmark(name: str, units: int, unit: str, threshold: float = None):
+    """Register a benchmark setup function under `name`."""
+    def register(setup: Callable[[], Callable]):
+        BENCHMARKS[name] = (setup, units, unit, threshold)
+        return setup
+    return register
+
+def _model():
+    from risk_model import CaptiveInsuranceModel
+    return CaptiveInsuranceModel(initial_capital=1_000_000, num_gcs=12, premium_per_gc_annual=50_000)
+
+def _roster(num_gcs: int):
+    from actors import GeneralContractor, MarketType, create_gc_roster
+    if num_gcs == 12:
+        return create_gc_roster()
+    markets = list(MarketType)
+    rng = random.Random(num_gcs)
+    return [GeneralContractor(id=i + 1, name=f"GC-{i + 1:04d}", skill_level=rng.uniform(0.6, 0.95),
+                              specialization=markets[i % len(markets)], max_concurrent_jobs=rng.randint(1, 3))
+            for i in range(num_gcs)]
+
+# Monte Carlo risk model
+
+@benchmark('mc_simulate_year', units=2_000, unit='years', threshold=SHORT_THRESHOLD)
+def _simulate_year():
+    model = _model()
+    def run():
+        random.seed(0)
+        for _ in range(2_000):
+            model.simulate_year(1_000_000)
+    return run
+
+@benchmark('mc_run_monte_carlo_scalar', units=200 * 10, unit='simulation-years', threshold=SHORT_THRESHOLD)
+def _run_monte_carlo_scalar():
+    model = _model()
+    return lambda: model.run_monte_carlo(num_simulations=200, years=10, seed=0)
+
+@benchmark('mc_run_monte_carlo_vectorized', units=50_000 * 10, unit='simulation-years')
+def _run_monte_carlo_vectorized():
+    model = _model()
+    return lambda: model.run_monte_carlo(num_simulations=50_000, years=10, engine='vectorized', seed=0)
+
+@benchmark('mc_required_capital', units=20_000, unit='claim streams')
+def _required_capital():
+    model = _model()
+    return lambda: model.calculate_required_capital(0.01, years=10, num_simulations=20_000, seed=0)
+
+# Installation queue
+
+def _queue_benchmark(num_gcs: int, units_per_market: int, backend: str = 'simpy'):
+    def setup():
+        from queue_sim import run_simulation
+        def run():
+            # A fresh roster per call: GC job counts carry over from the previous run
+            run_simulation(simulation_days=3650, units_per_market=units_per_market,
+                           gc_roster=_roster(num_gcs), seed=0, backend=backend)
+        return run
+    return setup
+
+# Throughput counts units offered over the ten-year horizon (three markets)
+for _num_gcs, _units in ((12, 60), (12, 600), (120, 3_000), (1_200, 20_000)):
+    benchmark(f'queue_run_simulation_{_num_gcs}gc_{_units}units', units=3 * _units, unit='units',
+              threshold=SHORT_THRESHOLD if _units < 600 else None)(_queue_benchmark(_num_gcs, _units))
+benchmark('queue_run_simulation_heap_1200gc_20000units', units=3 * 20_000, unit='units')(
+    _queue_benchmark(1_200, 20_000, backend='heap'))
+
+# Financial instrument
+
+@benchmark('instrument_process_month_1200', units=1_200, unit='months', threshold=SHORT_THRESHOLD)
+def _process_month():
+    from financial_instrument import MultigenEquityInstrument
+    def run():
+        plan = MultigenEquityInstrument(1_500_000, 1_200, 0.045, datetime(2025, 1, 1))
+        rng = random.Random(0)
+        for _ in range(1_200):
+            plan.process_month(risk_event_occurred=rng.random() < 0.05)
+    return run
+
+@benchmark('instrument_advance_1200', units=1_200, unit='months', threshold=SHORT_THRESHOLD)
+def _advance():
+    from financial_instrument import MultigenEquityInstrument
+    def run():
+        plan = MultigenEquityInstrument(1_500_000, 1_200, 0.045, datetime(2025, 1, 1))
+        plan.advance(1_200)
+        return plan.history
+    return run
+
+# main.py export and figure stages (written into a scratch directory)
+
+def _stage_benchmark(stage_name: str, params: Dict, write: Callable):
+    """
+    Compute a stage's data once, then time write(stage, data) inside a scratch copy
+    of the output tree (stage outputs use paths relative to src/).
+    """
+    def setup():
+        import main
+        stage = main.STAGES[stage_name]
+        data = stage['compute'](**{**stage['params'], **params})
+        scratch = tempfile.mkdtemp(prefix='captive-bench-')
+        atexit.register(shutil.rmtree, scratch, True)
+        workdir = os.path.join(scratch, 'src')
+        for path in (workdir, os.path.join(scratch, 'docs', 'assets'), os.path.join(scratch, 'data')):
+            os.makedirs(path)
+        def run():
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                write(stage, data)
+            finally:
+                os.chdir(cwd)
+        return run
+    return setup
+
+def _export_tables(stage, data):
+    stage['render'](data, 'parquet')
+
+def _draw_figures(stage, data):
+    import reporting
+    for path, (plot_data, draw) in stage['figures'].items():
+        # Drop the stamp so every call redraws instead of keeping the unchanged image
+        stamp = reporting._stamp_path(path)
+        if os.path.exists(stamp):
+            os.remove(stamp)
+        reporting.render_figure(path, draw, plot_data(data))
+
+for _stage, _params in [('financial_instrument', {}), ('queue', {'num_replications': 10}),
+                        ('monte_carlo', {'export_paths': True})]:
+    benchmark(f'main_export_{_stage}', units=1, unit='stages', threshold=SHORT_THRESHOLD)(
+        _stage_benchmark(_stage, _params, _export_tables))
+    benchmark(f'main_figures_{_stage}', units=1, unit='stages')(_stage_benchmark(_stage, _params, _draw_figures))
+
+def run_benchmark(name: str, repeat: int = 5, warmup: int = 1) -> Dict:
+    """
+    Time one benchmark.
+
+    :param name: Registered benchmark name
+    :param repeat: Timed calls
+    :param warmup: Untimed calls first (imports, caches)
+    :return: Dictionary with min/median/max seconds per call and throughput
+    """
+    setup, units, unit, _ = BENCHMARKS[name]
+    timings = []
+    # Progress output from the simulations would pollute the JSON on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        func = setup()
+        for _ in range(warmup):
+            func()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    return {
+        'min_s': min(timings),
+        'median_s': median,
+        'max_s': max(timings),
+        'repeat': repeat,
+        'throughput': units / median,
+        'unit': f"{unit}/s"
+    }
+
+def run_benchmarks(names: List[str], repeat: int = 5) -> Dict:
+    """Run benchmarks and return the results document (machine info plus per-benchmark timings)."""
+    results = {}
+    for name in names:
+        results[name] = run_benchmark(name, repeat)
+        print(f"  {name:<45} {results[name]['median_s'] * 1000:>10.1f} ms   "
+              f"{results[name]['throughput']:>14,.0f} {results[name]['unit']}", file=sys.stderr)
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'benchmarks': results
+    }
+
+def compare(results: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    Compare results against a baseline on the fastest call of each benchmark
+    (the least noisy statistic).
+
+    :param threshold: Allowed fractional slowdown (0.25 = 25% slower), unless the
+                      benchmark registers its own
+    :return: One row per benchmark in both documents, with the ratio and a regressed flag
+    """
+    rows = []
+    for name, current in results['benchmarks'].items():
+        previous = baseline['benchmarks'].get(name)
+        if previous is None:
+            continue
+        allowed = BENCHMARKS[name][3] if name in BENCHMARKS and BENCHMARKS[name][3] is not None else threshold
+        ratio = current['min_s'] / previous['min_s']
+        rows.append({'benchmark': name, 'baseline_s': previous['min_s'], 'current_s': current['min_s'],
+                     'ratio': ratio, 'threshold': allowed, 'regressed': ratio > 1 + allowed})
+    return rows
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the simulation hot paths")
+    parser.add_argument('--filter', default='', help="Only run benchmarks whose name contains this text")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed calls per benchmark")
+    parser.add_argument('--output', help="Write the results JSON here (default: stdout)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline results to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed fractional slowdown before failing (default: 0.25)")
+    parser.add_argument('--update-baseline', action='store_true', help="Save the results as the new baseline")
+    parser.add_argument('--list', action='store_true', help="List benchmark names and exit")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    print(f"Running {len(names)} benchmarks ({args.repeat} calls each)...", file=sys.stderr)
+    results = run_benchmarks(names, args.repeat)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(document + '\n')
+    else:
+        print(document)
+
+    if args.update_baseline:
+        baseline = {'benchmarks': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        # Keep entries for benchmarks that were filtered out of this run
+        baseline.update({key: value for key, value in results.items() if key != 'benchmarks'})
+        baseline['benchmarks'].update(results['benchmarks'])
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+            f.write('\n')
+        print(f"✓ Baseline updated: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one", file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold)
+
+    print("\nComparison with baseline (fastest call):", file=sys.stderr)
+    for row in rows:
+        status = "❌ REGRESSED" if row['regressed'] else "✓"
+        print(f"  {status:<12} {row['benchmark']:<45} {row['ratio']:>6.2f}x "
+              f"(limit {1 + row['threshold']:.2f}x)", file=sys.stderr)
+
+    regressions = [row['benchmark'] for row in rows if row['regressed']]
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    print("\n✓ No regressions", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3.10
+"""
+Table-driven claim model.
+Loads data/risk_tables.csv and data/GC_roster.csv and compiles them into arrays that the
+Monte Carlo and queue engines sample from in bulk: per-market claim probabilities, one
+alias table per market for the risk type of a claim, and (risk type, market) severity
+parameters.
+"""
+import csv
+import os
+import random
+import numpy as np
+from typing import List
+from actors import GeneralContractor, MarketType, RISK_TYPE_WEIGHTS
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+RISK_TABLES_PATH = os.path.join(DATA_DIR, 'risk_tables.csv')
+GC_ROSTER_PATH = os.path.join(DATA_DIR, 'GC_roster.csv')
+
+# Axis order of the compiled arrays; risk types follow the queue backends' RISK_TYPE_WEIGHTS
+MARKETS = list(MarketType)
+RISK_TYPES = list(RISK_TYPE_WEIGHTS)
+
+class AliasTable:
+    """
+    Walker/Vose alias tables for several discrete distributions over the same outcomes.
+
+    Each row of weights is one distribution. sample() draws from a different row for
+    every element in O(1) per draw: pick a column uniformly, then keep it or take its
+    alias with a single comparison.
+    """
+
+    def __init__(self, weights: np.ndarray):
+        """
+        :param weights: (rows, outcomes) non-negative weights; each row needs a positive total
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=float))
+        rows, outcomes = weights.shape
+        if (weights < 0).any() or (weights.sum(axis=1) <= 0).any():
+            raise ValueError("Alias table weights must be non-negative with a positive total per row")
+        self.probability = np.ones((rows, outcomes))
+        self.alias = np.tile(np.arange(outcomes), (rows, 1))
+
+        scaled = weights * outcomes / weights.sum(axis=1, keepdims=True)
+        for row in range(rows):
+            small = [i for i in range(outcomes) if scaled[row, i] < 1]
+            large = [i for i in range(outcomes) if scaled[row, i] >= 1]
+            while small and large:
+                lesser, greater = small.pop(), large.pop()
+                self.probability[row, lesser] = scaled[row, lesser]
+                self.alias[row, lesser] = greater
+                scaled[row, greater] -= 1 - scaled[row, lesser]
+                (small if scaled[row, greater] < 1 else large).append(greater)
+            # Leftovers are 1 up to rounding and keep themselves
+
+    def sample(self, rows: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Draw one outcome for each entry of `rows` from that row's distribution."""
+        rows = np.asarray(rows)
+        columns = rng.integers(self.probability.shape[1], size=rows.shape)
+        keep = rng.random(rows.shape) < self.probability[rows, columns]
+        return np.where(keep, columns, self.alias[rows, columns])
+
+    def sample_one(self, row: int) -> int:
+        """Scalar draw with the random module (for the scalar engines)."""
+        column = random.randrange(self.probability.shape[1])
+        return column if random.random() < self.probability[row, column] else int(self.alias[row, column])
+
+class ClaimTables:
+    """
+    Compiled risk tables.
+
+    A GC in a market has a claim with probability claim_probability[market] (the sum
+    of the market's base probabilities over risk types). The claim's risk type is drawn
+    from that market's alias table, weighted by the base probabilities, and its
+    severity from a normal with that (risk type, market)'s mean and standard deviation,
+    floored at zero.
+    """
+
+    def __init__(self, base_probability: np.ndarray, severity_mean: np.ndarray, severity_std: np.ndarray):
+        """
+        :param base_probability: (risk types, markets) claim probabilities
+        :param severity_mean: (risk types, markets) mean severities
+        :param severity_std: (risk types, markets) severity standard deviations
+        """
+        self.base_probability = base_probability
+        self.severity_mean = severity_mean
+        self.severity_std = severity_std
+        self.claim_probability = base_probability.sum(axis=0)
+        if (self.claim_probability > 1).any():
+            raise ValueError("Claim probabilities in a market sum to more than 1")
+        self.risk_alias = AliasTable(base_probability.T)
+
+    def expected_claims(self, market_codes: np.ndarray) -> np.ndarray:
+        """Expected annual claims of a GC in each given market (severity floor ignored)."""
+        return (self.base_probability * self.severity_mean).sum(axis=0)[market_codes]
+
+    def sample_risk_types(self, market_codes: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Risk type code (index into RISK_TYPES) of a claim in each given market."""
+        return self.risk_alias.sample(market_codes, rng)
+
+    def sample_severities(self, risk_codes: np.ndarray, market_codes: np.ndarray,
+                          rng: np.random.Generator) -> np.ndarray:
+        """Claim amount for each (risk type, market) pair of codes."""
+        severity = rng.normal(self.severity_mean[risk_codes, market_codes],
+                              self.severity_std[risk_codes, market_codes])
+        return np.maximum(severity, 0, out=severity)
+
+    def draw_claims(self, gc_markets: np.ndarray, num_simulations: int, years: int,
+                    rng: np.random.Generator, frequency_multiplier: np.ndarray = None):
+        """
+        Draw claims for every (simulation, year, GC) at once.
+
+        Only cells that have a claim draw a risk type and a severity, and the totals are
+        accumulated with one bincount instead of per-claim lookups.
+
+        :param gc_markets: Market code of each GC
+        :param frequency_multiplier: Optional (simulations, years, markets) shocks scaling
+                                     each market's claim probability
+        :return: Tuple of (total_claims, num_claims) arrays shaped (simulations, years)
+        """
+        claim_probability = self.claim_probability[gc_markets]
+        if frequency_multiplier is not None:
+            claim_probability = np.minimum(claim_probability * frequency_multiplier[..., gc_markets], 1)
+        has_claim = rng.random((num_simulations, years, gc_markets.size)) < claim_probability
+        claim_cells = np.flatnonzero(has_claim)
+        markets = gc_markets[claim_cells % gc_markets.size]
+        severity = self.sample_severities(self.sample_risk_types(markets, rng), markets, rng)
+        total_claims = np.bincount(claim_cells // gc_markets.size, weights=severity,
+                                   minlength=num_simulations * years)
+        return total_claims.reshape(num_simulations, years), has_claim.sum(axis=2)
+
+    def draw_claim(self, market: int) -> float:
+        """Scalar claim amount for one claim in a market (random module and np.random, like simulate_year)."""
+        risk = self.risk_alias.sample_one(market)
+        return max(0, np.random.normal(self.severity_mean[risk, market], self.severity_std[risk, market]))
+
+def load_claim_tables(path: str = RISK_TABLES_PATH) -> ClaimTables:
+    """
+    Compile a risk tables CSV (risk_type, market, base_probability, mean_severity,
+    std_severity). (risk type, market) pairs missing from the file get no claims.
+    """
+    shape = (len(RISK_TYPES), len(MARKETS))
+    base_probability, severity_mean, severity_std = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    risk_codes = {risk.value: code for code, risk in enumerate(RISK_TYPES)}
+    market_codes = {market.value: code for code, market in enumerate(MARKETS)}
+
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if row['risk_type'] not in risk_codes or row['market'] not in market_codes:
+                raise ValueError(f"Unknown risk type or market in {path}: "
+                                 f"{row['risk_type']}, {row['market']}")
+            cell = risk_codes[row['risk_type']], market_codes[row['market']]
+            base_probability[cell] = float(row['base_probability'])
+            severity_mean[cell] = float(row['mean_severity'])
+            severity_std[cell] = float(row['std_severity'])
+
+    return ClaimTables(base_probability, severity_mean, severity_std)
+
+def load_gc_roster(path: str = GC_ROSTER_PATH) -> List[GeneralContractor]:
+    """Read a GC roster CSV (id, name, skill_level, specialization, max_concurrent_jobs)."""
+    with open(path, newline='') as f:
+        return [GeneralContractor(id=int(row['id']),
+                                  name=row['name'],
+                                  skill_level=float(row['skill_level']),
+                                  specialization=MarketType(row['specialization']),
+                                  max_concurrent_jobs=int(row['max_concurrent_jobs']))
+                for row in csv.DictReader(f)]
+
+def market_codes(gc_roster: List[GeneralContractor]) -> np.ndarray:
+    """Market code (index into MARKETS) of each GC's specialization."""
+    return np.array([MARKETS.index(gc.specialization) for gc in gc_roster], dtype=np.int64)
+
+if __name__ == "__main__":
+    tables = load_claim_tables()
+    roster = load_gc_roster()
+    print(f"Loaded {len(roster)} GCs from {GC_ROSTER_PATH}")
+    for code, market in enumerate(MARKETS):
+        print(f"  {market.value:>9}: claim probability {tables.claim_probability[code]:.2f}, "
+              f"expected claims ${tables.expected_claims(np.array([code]))[0]:,.0f} per GC-year")
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3.10
+"""
+Heap-based installation queue simulator: a lean alternative backend to the SimPy model.
+Draws all unit attributes up front into arrays and runs a single event heap, with no
+generator or timeout object per unit.
+"""
+import heapq
+import random
+import numpy as np
+from typing import List, Dict, TYPE_CHECKING
+import instrumentation
+from actors import GeneralContractor, MarketType, RiskType, RISK_TYPE_WEIGHTS, create_gc_roster
+from records import ColumnarRecorder, COMPLETED_UNIT_SCHEMA, RISK_EVENT_SCHEMA
+from queue_sim import (GCAvailabilityIndex, get_dispatch_policy, run_simulation,
+                       ARRIVAL_RATES, INSTALLATION_TIMES, INSTALLATION_TIME_VARIATION, RISK_DELAYS)
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported in compare_backends: the simulation does not need it
+    from claim_tables import ClaimTables
+
+MARKETS = list(MarketType)
+RISK_TYPES = list(RISK_TYPE_WEIGHTS)
+
+class FastInstallationQueue:
+    """
+    Array-backed queue state with the same dispatch interface as InstallationQueue
+    (gc_index, queued_units, longest_waiting_market), so dispatch policies are shared.
+    """
+
+    def __init__(self, gc_roster: List[GeneralContractor], dispatch_policy='specialist_first'):
+        self.gc_roster = gc_roster
+        self.policy = get_dispatch_policy(dispatch_policy)
+        self.select_gc = instrumentation.instrumented(self.policy.select_gc, 'queue.select_gc')
+        self.select_market = instrumentation.instrumented(self.policy.select_market, 'queue.select_market')
+        self.gc_index = GCAvailabilityIndex(gc_roster)
+        # Waiting units per market: heap of (arrival_time, unit index)
+        self.waiting = {market: [] for market in MarketType}
+
+    def queued_units(self, market_type: MarketType) -> int:
+        return len(self.waiting[market_type])
+
+    def longest_waiting_market(self):
+        heads = [(queue[0], market) for market, queue in self.waiting.items() if queue]
+        return min(heads, key=lambda head: head[0])[1] if heads else None
+
+def draw_units(units_per_market: int, rng: np.random.Generator,
+               claim_tables: 'ClaimTables' = None) -> Dict[str, np.ndarray]:
+    """
+    Draw every unit's arrival time, installation time and risk attributes at once.
+
+    :param claim_tables: Draw risk types from each market's alias table, and a claim
+                         amount per unit, instead of using RISK_TYPE_WEIGHTS
+    :return: Dictionary of per-unit arrays, sorted by arrival time
+    """
+    market_codes, arrivals, install_days = [], [], []
+    low, high = INSTALLATION_TIME_VARIATION
+    for code, market in enumerate(MARKETS):
+        arrivals.append(np.cumsum(rng.exponential(ARRIVAL_RATES[market], units_per_market)))
+        install_days.append(INSTALLATION_TIMES[market] + rng.integers(low, high + 1, units_per_market))
+        market_codes.append(np.full(units_per_market, code))
+
+    market_codes = np.concatenate(market_codes)
+    order = np.argsort(np.concatenate(arrivals), kind='stable')
+    num_units = market_codes.size
+
+    # Risk type and delay are drawn for every unit; they only apply if a risk occurs
+    if claim_tables is None:
+        risk_codes = rng.choice(len(RISK_TYPES), size=num_units, p=list(RISK_TYPE_WEIGHTS.values()))
+    else:
+        risk_codes = claim_tables.sample_risk_types(market_codes[order], rng)
+    delay_ranges = np.array([RISK_DELAYS[risk] for risk in RISK_TYPES])
+    delays = rng.integers(delay_ranges[risk_codes, 0], delay_ranges[risk_codes, 1] + 1)
+
+    units = {
+        'market': market_codes[order],
+        'arrival_time': np.concatenate(arrivals)[order],
+        'installation_days': np.concatenate(install_days)[order],
+        # Unique across markets: market code * units_per_market + sequence number within the market
+        'unit_id': order,
+        'risk_draw': rng.random(num_units),
+        'risk_type': risk_codes,
+        'risk_delay': delays
+    }
+    if claim_tables is not None:
+        units['claim_amount'] = claim_tables.sample_severities(risk_codes, market_codes[order], rng)
+    return units
+
+def run_simulation_fast(simulation_days: int = 365,
+                        units_per_market: int = 50,
+                        gc_roster: List[GeneralContractor] = None,
+                        dispatch_policy='specialist_first',
+                        seed: int = None,
+                        claim_tables: 'ClaimTables' = None) -> Dict:
+    """
+    Run the installation queue with the heap backend.
+
+    Same model and same results dictionary as queue_sim.run_simulation, but with
+    one event heap and array-backed unit state instead of SimPy processes.
+
+    :param simulation_days: Total days to simulate
+    :param units_per_market: Number of units to install per market
+    :param gc_roster: GCs to simulate (default: create_gc_roster())
+    :param dispatch_policy: Name from queue_sim.DISPATCH_POLICIES or a policy instance
+    :param seed: Optional seed for reproducible runs
+    :param claim_tables: Compiled risk tables (claim_tables.load_claim_tables()); each
+                         market's base risk, risk type mix and claim amounts then come
+                         from the tables, and the results gain 'risk_event_claims'
+    :return: Dictionary of simulation results
+    """
+    if seed is not None:
+        random.seed(seed)
+    if gc_roster is None:
+        gc_roster = create_gc_roster()
+    rng = np.random.default_rng(seed)
+
+    units = draw_units(units_per_market, rng, claim_tables)
+    # Units arriving after the horizon never enter the system
+    horizon = int(np.searchsorted(units['arrival_time'], simulation_days))
+    units = {key: values[:horizon] for key, values in units.items()}
+    num_units = units['market'].size
+    start_time = np.full(num_units, np.nan)
+    gc_of_unit = np.zeros(num_units, dtype=np.int64)
+    had_risk = np.zeros(num_units, dtype=bool)
+
+    # Plain lists are much faster than NumPy arrays for the per-event scalar reads below
+    arrival_times = units['arrival_time'].tolist()
+    unit_market_codes = units['market'].tolist()
+    installation_days = units['installation_days'].tolist()
+    risk_draws = units['risk_draw'].tolist()
+    risk_delays = units['risk_delay'].tolist()
+
+    queue = FastInstallationQueue(gc_roster, dispatch_policy)
+    gcs = {gc.id: gc for gc in gc_roster}
+    # Risk probability of each GC in each market (by market code), computed once per run
+    if claim_tables is None:
+        risk_probability = {gc.id: [gc.calculate_risk_probability(market) for market in MARKETS]
+                            for gc in gc_roster}
+    else:
+        base_risk = claim_tables.claim_probability.tolist()
+        risk_probability = {gc.id: [gc.calculate_risk_probability(market, base_risk[code])
+                                    for code, market in enumerate(MARKETS)] for gc in gc_roster}
+    gc_assignments = {gc.id: 0 for gc in gc_roster}
+    gc_busy_days = {gc.id: 0.0 for gc in gc_roster}
+
+    completions = []  # heap of (finish_time, unit index)
+    completed = []
+    risk_events = []
+
+    def start(unit: int, gc: GeneralContractor, now: float):
+        gc.start_job()
+        gc_assignments[gc.id] += 1
+        start_time[unit] = now
+        gc_of_unit[unit] = gc.id
+
+        finish = now + installation_days[unit]
+        if risk_draws[unit] < risk_probability[gc.id][unit_market_codes[unit]]:
+            had_risk[unit] = True
+            if finish < simulation_days:
+                risk_events.append((finish, unit))
+            finish += risk_delays[unit]
+        heapq.heappush(completions, (finish, unit))
+
+    try:
+        with instrumentation.timer('queue.run'):
+            next_arrival = 0
+            while True:
+                arrival = arrival_times[next_arrival] if next_arrival < num_units else np.inf
+                finish = completions[0][0] if completions else np.inf
+                now = min(arrival, finish)
+                if now >= simulation_days:
+                    break
+
+                if finish <= arrival:
+                    # Completion: free the GC and dispatch it to waiting units
+                    _, unit = heapq.heappop(completions)
+                    gc = gcs[gc_of_unit[unit]]
+                    gc_busy_days[gc.id] += now - start_time[unit]
+                    gc.complete_job()
+                    completed.append((now, unit))
+
+                    while gc.is_available():
+                        market = queue.select_market(queue, gc)
+                        if market is None:
+                            break
+                        _, waiting_unit = heapq.heappop(queue.waiting[market])
+                        start(waiting_unit, gc, now)
+                else:
+                    # Arrival: start immediately if the policy finds a GC, otherwise wait
+                    unit = next_arrival
+                    next_arrival += 1
+                    market = MARKETS[unit_market_codes[unit]]
+                    gc = queue.select_gc(queue, market)
+                    if gc is not None:
+                        start(unit, gc, now)
+                    else:
+                        heapq.heappush(queue.waiting[market], (now, unit))
+    finally:
+        queue.gc_index.close()
+
+    # Each arrival and each completion is one event
+    instrumentation.count('queue.events', next_arrival + len(completed))
+    instrumentation.count('queue.units_completed', len(completed))
+
+    # Compile results in the same layout as queue_sim.run_simulation
+    started = np.flatnonzero(~np.isnan(start_time))
+    started = started[np.argsort(start_time[started], kind='stable')]
+    waiting_times = (start_time[started] - units['arrival_time'][started]).tolist()
+
+    # Event logs are built column-wise straight from the unit arrays
+    finished = np.array([unit for _, unit in completed], dtype=np.int64)
+    completed_units = ColumnarRecorder.from_columns(COMPLETED_UNIT_SCHEMA, {
+        'unit_id': units['unit_id'][finished],
+        'market': units['market'][finished],
+        'completion_time': np.array([time for time, _ in completed], dtype=float),
+        'wait_time': start_time[finished] - units['arrival_time'][finished],
+        'gc_id': gc_of_unit[finished],
+        'had_risk_event': had_risk[finished]
+    })
+
+    risk_events.sort()
+    risky = np.array([unit for _, unit in risk_events], dtype=np.int64)
+    risk_codes = np.array([list(RiskType).index(risk) for risk in RISK_TYPES])
+    risk_event_records = ColumnarRecorder.from_columns(RISK_EVENT_SCHEMA, {
+        'time': np.array([time for time, _ in risk_events], dtype=float),
+        'unit_id': units['unit_id'][risky],
+        'market': units['market'][risky],
+        'risk_type': risk_codes[units['risk_type'][risky]],
+        'gc_id': gc_of_unit[risky]
+    })
+
+    results = {
+        'completed_units': completed_units,
+        'risk_events': risk_event_records,
+        'waiting_times': waiting_times,
+        'gc_utilization': gc_assignments,
+        'gc_busy_days': gc_busy_days,
+        'total_units_completed': len(completed_units),
+        'total_risk_events': len(risk_event_records),
+        'avg_wait_time': sum(waiting_times) / len(waiting_times) if waiting_times else 0
+    }
+    if claim_tables is not None:
+        # Claim amount of each risk event, in risk_events order
+        results['risk_event_claims'] = units['claim_amount'][risky]
+    return results
+
+def compare_backends(replications: int = 40,
+                     simulation_days: int = 365,
+                     units_per_market: int = 60,
+                     seed: int = 0) -> 'pd.DataFrame':
+    """
+    Cross-check the heap backend against the SimPy backend.
+
+    Runs independent replications of both and compares the mean of each headline
+    metric with Welch's t-test. Large p-values mean the backends agree statistically.
+
+    :return: DataFrame with per-backend means and the p-value for each metric
+    """
+    import pandas as pd
+    from scipy import stats
+    seeds = [int(child.generate_state(1)[0])
+             for child in np.random.SeedSequence(seed).spawn(2 * replications)]
+    metrics = ['total_units_completed', 'avg_wait_time', 'total_risk_events']
+
+    samples = {'simpy': {metric: [] for metric in metrics}, 'heap': {metric: [] for metric in metrics}}
+    for i in range(replications):
+        for backend, results in (
+            ('simpy', run_simulation(simulation_days, units_per_market, seed=seeds[2 * i])),
+            ('heap', run_simulation_fast(simulation_days, units_per_market, seed=seeds[2 * i + 1]))
+        ):
+            for metric in metrics:
+                samples[backend][metric].append(results[metric])
+
+    rows = []
+    for metric in metrics:
+        simpy_values, heap_values = samples['simpy'][metric], samples['heap'][metric]
+        rows.append({
+            'metric': metric,
+            'simpy_mean': np.mean(simpy_values),
+            'heap_mean': np.mean(heap_values),
+            'p_value': stats.ttest_ind(simpy_values, heap_values, equal_var=False).pvalue
+        })
+    return pd.DataFrame(rows).set_index('metric')
+
+if __name__ == "__main__":
+    import time
+
+    print("Cross-checking heap backend against SimPy backend...")
+    print("=" * 60)
+    comparison = compare_backends()
+    print(comparison.to_string(float_format=lambda value: f"{value:.3f}"))
+
+    if (comparison['p_value'] < 0.01).any():
+        print("\n❌ Backends disagree (p < 0.01)")
+        raise SystemExit(1)
+    print("\n✓ Backends agree statistically")
+
+    # Timing on a large network: 1,200 GCs, ten years, up to 100k units per market
+    print("\nTiming 1,200 GCs over 10 years...")
+    for name, runner in (('simpy', run_simulation), ('heap', run_simulation_fast)):
+        roster = [GeneralContractor(id=i + 1, name=f"GC-{i + 1:04d}", skill_level=random.uniform(0.6, 0.95),
+                                    specialization=MARKETS[i % len(MARKETS)], max_concurrent_jobs=1)
+                  for i in range(1_200)]
+        start = time.perf_counter()
+        results = runner(simulation_days=3650, units_per_market=100_000, gc_roster=roster, seed=1)
+        print(f"  {name:>5}: {results['total_units_completed']} units in {time.perf_counter() - start:.2f}s")
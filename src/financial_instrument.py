@@ -1,7 +1,57 @@
 #!/usr/bin/env python3.10
-import pandas as pd
+import bisect
+import numpy as np
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported where used: the numeric core does not need it
+
+def annuity_balance(balance, monthly_payment, monthly_rate, months):
+    """
+    Closed-form balance after `months` months of interest plus a fixed payment.
+    
+    Solves B[n] = B[n-1] * (1 + r) + P, i.e. B[n] = B[0] * g^n + P * (g^n - 1) / r.
+    Works element-wise on NumPy arrays.
+    """
+    balance, monthly_payment, monthly_rate, months = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (balance, monthly_payment, monthly_rate, months))
+    )
+    growth = (1 + monthly_rate) ** months
+    safe_rate = np.where(monthly_rate == 0, 1.0, monthly_rate)
+    annuity_factor = np.where(monthly_rate == 0, months, (growth - 1) / safe_rate)
+    return balance * growth + monthly_payment * annuity_factor
+
+def months_to_target(balance, monthly_payment, monthly_rate, target):
+    """
+    Smallest number of months n >= 0 for which annuity_balance(...) >= target.
+    Returns np.inf where the target is never reached (no payment and no balance growth).
+    Works element-wise on NumPy arrays.
+    """
+    balance, monthly_payment, monthly_rate, target = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (balance, monthly_payment, monthly_rate, target))
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # With interest: (B0 + P/r) * g^n - P/r >= A
+        offset = monthly_payment / np.where(monthly_rate == 0, 1.0, monthly_rate)
+        ratio = (target + offset) / (balance + offset)
+        compounding = np.ceil(np.log(ratio) / np.log1p(monthly_rate))
+        # Without interest: B0 + n * P >= A
+        linear = np.ceil((target - balance) / monthly_payment)
+        months = np.where(monthly_rate == 0, linear, compounding)
+    
+    months = np.where(np.isnan(months) | (months < 0), np.inf, months)
+    months = np.where(balance >= target, 0.0, months)
+    
+    # Guard against rounding in the logarithm: step one month either way if needed
+    finite = np.isfinite(months) & (months > 0)
+    if finite.any():
+        n = np.where(finite, months, 0)
+        too_late = finite & (annuity_balance(balance, monthly_payment, monthly_rate, n - 1) >= target)
+        too_early = finite & (annuity_balance(balance, monthly_payment, monthly_rate, n) < target)
+        months = months - too_late + too_early
+    return months
 
 @dataclass
 class AccessibilityFeatures:
@@ -35,10 +85,17 @@ class MultigenEquityInstrument:
         self.vested_equity_percent = 0.0
         self.months_elapsed = 0
         self.is_fully_vested = False
+        self.vesting_month = None  # Month in which full vesting was reached
         self.residence_swapped = False # Has parent moved in?
         
-        # The Ledger (for generating graphs later)
-        self.history = []
+        # Months with a known missed payment (sorted), used by advance()
+        self.missed_payment_schedule = []
+        
+        # The Ledger (for generating graphs later). Fast-forwarded stretches are
+        # kept as (start_month, months, start_balance, missed) segments and
+        # only expanded into rows when the history is read.
+        self._history = []
+        self._pending_segments = []
 
         # Technical Specs (The physical asset)
         self.specs = AccessibilityFeatures()
@@ -49,6 +106,8 @@ class MultigenEquityInstrument:
         
         :param risk_event_occurred: If True, child missed payment (Insurance Event).
         """
+        self._flush_history()
+        risk_event_occurred = risk_event_occurred or self._is_scheduled_miss(self.months_elapsed)
         current_date = self.start_date + timedelta(days=30 * self.months_elapsed)
         
         # 1. Apply Interest to existing balance
@@ -70,10 +129,11 @@ class MultigenEquityInstrument:
         
         if self.vested_equity_percent >= 1.0 and not self.is_fully_vested:
             self.is_fully_vested = True
+            self.vesting_month = self.months_elapsed
             # In a real app, this might trigger a contract generation event
 
         # 4. Record State for Visualization
-        self.history.append({
+        self._history.append({
             "date": current_date,
             "month": self.months_elapsed,
             "balance": round(self.current_balance, 2),
@@ -84,6 +144,126 @@ class MultigenEquityInstrument:
         
         self.months_elapsed += 1
 
+    @property
+    def history(self):
+        """Month-by-month ledger, including any fast-forwarded months."""
+        self._flush_history()
+        return self._history
+
+    def schedule_missed_payments(self, months):
+        """
+        Register months (0-based) in which the payment will be missed.
+        Both process_month and the fast-forward methods honour the schedule.
+        """
+        for month in months:
+            if month not in self.missed_payment_schedule:
+                bisect.insort(self.missed_payment_schedule, int(month))
+
+    def _is_scheduled_miss(self, month: int) -> bool:
+        index = bisect.bisect_left(self.missed_payment_schedule, month)
+        return index < len(self.missed_payment_schedule) and self.missed_payment_schedule[index] == month
+
+    def _next_scheduled_miss(self):
+        index = bisect.bisect_left(self.missed_payment_schedule, self.months_elapsed)
+        if index < len(self.missed_payment_schedule):
+            return self.missed_payment_schedule[index]
+        return None
+
+    def _advance_segment(self, months: int, missed: bool = False):
+        """Advance in closed form over months that all have the same contribution."""
+        contribution = 0.0 if missed else self.monthly_payment
+        self._pending_segments.append((self.months_elapsed, months, self.current_balance, missed))
+
+        if not self.is_fully_vested:
+            to_vest = months_to_target(self.current_balance, contribution,
+                                       self.monthly_rate, self.asset_value)
+            if to_vest <= months:
+                self.is_fully_vested = True
+                self.vesting_month = self.months_elapsed + int(to_vest) - 1
+
+        self.current_balance = float(annuity_balance(self.current_balance, contribution,
+                                                     self.monthly_rate, months))
+        self.vested_equity_percent = min(1.0, self.current_balance / self.asset_value)
+        self.months_elapsed += months
+
+    def advance(self, months: int):
+        """
+        Advance the agreement by several months without stepping through each one.
+        
+        Stretches between scheduled missed payments are solved in closed form, so
+        the cost is O(number of missed payments) rather than O(months).
+        
+        :param months: Number of months to advance
+        """
+        end_month = self.months_elapsed + months
+        while self.months_elapsed < end_month:
+            next_miss = self._next_scheduled_miss()
+            if next_miss == self.months_elapsed:
+                self._advance_segment(1, missed=True)
+            else:
+                stop = end_month if next_miss is None else min(next_miss, end_month)
+                self._advance_segment(stop - self.months_elapsed)
+
+    def advance_to_next_event(self, max_months: int = None):
+        """
+        Advance to whichever comes first: full vesting, or the next scheduled
+        missed payment (which is processed).
+        
+        :param max_months: Optional limit on the number of months to advance
+        :return: 'vested', 'missed_payment', or None if neither happened
+        """
+        limit = np.inf if max_months is None else max_months
+        to_vest = np.inf
+        if not self.is_fully_vested:
+            to_vest = float(months_to_target(self.current_balance, self.monthly_payment,
+                                             self.monthly_rate, self.asset_value))
+        next_miss = self._next_scheduled_miss()
+        to_miss = np.inf if next_miss is None else next_miss - self.months_elapsed + 1
+
+        months = min(to_vest, to_miss, limit)
+        if not np.isfinite(months):
+            return None
+        self.advance(int(months))
+
+        if months == to_miss:
+            return 'missed_payment'
+        if months == to_vest:
+            return 'vested'
+        return None
+
+    def advance_to_vesting(self, max_months: int = 1200):
+        """
+        Advance until the agreement is fully vested.
+        
+        :param max_months: Give up after this many months
+        :return: Month in which full vesting was reached, or None
+        """
+        end_month = self.months_elapsed + max_months
+        while not self.is_fully_vested and self.months_elapsed < end_month:
+            if self.advance_to_next_event(end_month - self.months_elapsed) is None:
+                break
+        return self.vesting_month
+
+    def _flush_history(self):
+        """Expand fast-forwarded segments into ledger rows."""
+        for start_month, months, start_balance, missed in self._pending_segments:
+            contribution = 0.0 if missed else self.monthly_payment
+            steps = np.arange(months + 1)
+            balances = annuity_balance(start_balance, contribution, self.monthly_rate, steps)
+            interest = balances[:-1] * self.monthly_rate
+            vesting = np.minimum(1.0, balances[1:] / self.asset_value)
+            for k in range(months):
+                month = start_month + k
+                self._history.append({
+                    "date": self.start_date + timedelta(days=30 * month),
+                    "month": month,
+                    "balance": round(float(balances[k + 1]), 2),
+                    "vesting_percent": round(float(vesting[k]) * 100, 2),
+                    "interest_earned": round(float(interest[k]), 2),
+                    "risk_event": missed
+                })
+        self._pending_segments = []
+
     def trigger_residence_swap(self):
         """
         Activates the clause where parents swap homes with the child
@@ -97,8 +277,134 @@ class MultigenEquityInstrument:
 
     def export_data(self):
         """Returns a Pandas DataFrame for easy plotting in the website generator."""
+        import pandas as pd
         return pd.DataFrame(self.history)
 
+class MultigenEquityPortfolio:
+    """
+    A book of Rent-to-Equity agreements held as arrays and advanced together.
+    
+    Each contract has its own asset value, payment and APY. Only the current state
+    and each contract's vesting month are kept, not per-month histories.
+    """
+    
+    def __init__(self,
+                 total_asset_values,
+                 monthly_payments,
+                 interest_rates_apy,
+                 start_date: datetime):
+        """
+        :param total_asset_values: Cost of each contract's prefab unit
+        :param monthly_payments: Each contract's monthly payment
+        :param interest_rates_apy: Each contract's APY
+        :param start_date: Common start date of the book
+        """
+        self.asset_values = np.asarray(total_asset_values, dtype=float)
+        self.num_contracts = self.asset_values.size
+        self.monthly_payments = np.broadcast_to(np.asarray(monthly_payments, dtype=float),
+                                                self.asset_values.shape).copy()
+        interest_rates_apy = np.broadcast_to(np.asarray(interest_rates_apy, dtype=float),
+                                             self.asset_values.shape)
+        self.monthly_rates = (1 + interest_rates_apy) ** (1/12) - 1
+        self.start_date = start_date
+        
+        # State Tracking
+        self.balances = np.zeros(self.num_contracts)
+        self.months_elapsed = 0
+        self.missed_payments = np.zeros(self.num_contracts, dtype=np.int64)
+        self.vesting_months = np.full(self.num_contracts, -1, dtype=np.int64)  # -1 = not vested
+    
+    @property
+    def vested_equity_percent(self) -> np.ndarray:
+        return np.minimum(1.0, self.balances / self.asset_values)
+    
+    @property
+    def is_fully_vested(self) -> np.ndarray:
+        return self.vesting_months >= 0
+    
+    def process_month(self, risk_events=None):
+        """
+        Advance every contract by one month (same rules as MultigenEquityInstrument.process_month).
+        
+        :param risk_events: Boolean array, True where the contract missed this month's payment
+        """
+        contributions = self.monthly_payments
+        if risk_events is not None:
+            risk_events = np.asarray(risk_events, dtype=bool)
+            contributions = np.where(risk_events, 0.0, self.monthly_payments)
+            self.missed_payments += risk_events
+        
+        self.balances *= 1 + self.monthly_rates
+        self.balances += contributions
+        
+        newly_vested = (self.vesting_months < 0) & (self.balances >= self.asset_values)
+        self.vesting_months[newly_vested] = self.months_elapsed
+        self.months_elapsed += 1
+    
+    def advance(self, months: int, risk_events=None):
+        """
+        Advance every contract by several months.
+        
+        Without risk events the balances jump straight to their closed-form values
+        (geometric series), in O(1) per contract whatever the horizon.
+        
+        :param months: Number of months to advance
+        :param risk_events: Optional (num_contracts, months) boolean array of missed payments
+        """
+        if risk_events is not None:
+            risk_events = np.asarray(risk_events, dtype=bool)
+            for month in range(months):
+                self.process_month(risk_events[:, month])
+            return
+        
+        if months <= 0:
+            return
+        
+        # Vesting month of contracts that cross their asset value during the jump
+        unvested = self.vesting_months < 0
+        to_vest = months_to_target(self.balances, self.monthly_payments,
+                                   self.monthly_rates, self.asset_values)
+        vests = unvested & (to_vest <= months)
+        self.vesting_months[vests] = self.months_elapsed + to_vest[vests].astype(np.int64) - 1
+        
+        self.balances = annuity_balance(self.balances, self.monthly_payments, self.monthly_rates, months)
+        self.months_elapsed += months
+    
+    def simulate(self, months: int, missed_payment_probability, seed: int = None):
+        """
+        Advance every contract with random missed payments, drawn one month at a time.
+        
+        :param months: Number of months to advance
+        :param missed_payment_probability: Monthly probability of a missed payment
+                                           (scalar or one value per contract)
+        :param seed: Optional seed for reproducible runs
+        """
+        rng = np.random.default_rng(seed)
+        probability = np.broadcast_to(np.asarray(missed_payment_probability, dtype=float),
+                                      self.asset_values.shape)
+        for _ in range(months):
+            self.process_month(rng.random(self.num_contracts) < probability)
+    
+    def vesting_dates(self) -> 'pd.Series':
+        """Date each contract became fully vested (NaT if not yet vested)."""
+        import pandas as pd
+        days = np.where(self.vesting_months >= 0, self.vesting_months * 30, np.nan)
+        return pd.Series(pd.Timestamp(self.start_date) + pd.to_timedelta(days, unit='D'),
+                         name="vesting_date")
+    
+    def export_data(self) -> 'pd.DataFrame':
+        """Per-contract state as a DataFrame."""
+        import pandas as pd
+        return pd.DataFrame({
+            "asset_value": self.asset_values,
+            "monthly_payment": self.monthly_payments,
+            "balance": self.balances,
+            "vesting_percent": self.vested_equity_percent * 100,
+            "missed_payments": self.missed_payments,
+            "vesting_month": self.vesting_months,
+            "vesting_date": self.vesting_dates()
+        })
+
 # --- QUICK TEST BLOCK (Runs if you execute this file directly) ---
 if __name__ == "__main__":
     # Simulate a $150k Prefab ADU, $1,200/mo rent, 4.5% APY
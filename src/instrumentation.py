@@ -0,0 +1,212 @@
+#!/usr/bin/env python3.10
+"""
+Opt-in timers, counters and profiling for the simulation engine.
+
+Disabled by default. timer() then hands back a shared no-op context and instrumented()
+returns functions unchanged, so instrumented code costs nothing unless metrics are switched
+on with enable() or CAPTIVE_METRICS=1. Metrics collected in worker processes are shipped
+back with submit()/result() and pool_map(), and can be written as JSON or Prometheus text.
+"""
+import os
+import json
+import time
+import functools
+import contextlib
+from itertools import repeat
+from typing import Callable, Dict
+
+ENV_VAR = 'CAPTIVE_METRICS'
+
+_enabled = os.environ.get(ENV_VAR, '') not in ('', '0')
+_timers = {}  # section name -> [calls, seconds]
+_counters = {}  # counter name -> total
+
+# Derived rates: rate name -> (counter, timed section)
+RATES = {
+    'mc.paths_per_second': ('mc.paths', 'mc.simulate_paths'),
+    'mc.claim_streams_per_second': ('mc.claim_streams', 'mc.ruin_thresholds'),
+    'queue.events_per_second': ('queue.events', 'queue.run')
+}
+
+_NULL_TIMER = contextlib.nullcontext()
+
+class _Timer:
+    """Context manager adding its elapsed wall-clock time to a named section."""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+def enabled() -> bool:
+    return _enabled
+
+def enable():
+    """Start collecting metrics (in this process and in worker processes it starts)."""
+    global _enabled
+    _enabled = True
+    os.environ[ENV_VAR] = '1'
+
+def disable():
+    global _enabled
+    _enabled = False
+    os.environ.pop(ENV_VAR, None)
+
+def reset():
+    """Discard everything collected so far."""
+    _timers.clear()
+    _counters.clear()
+
+def timer(name: str):
+    """Time a block: `with timer('mc.simulate_paths'): ...` (a no-op when disabled)."""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+def add_time(name: str, seconds: float, calls: int = 1):
+    if _enabled:
+        section = _timers.setdefault(name, [0, 0.0])
+        section[0] += calls
+        section[1] += seconds
+
+def count(name: str, value: int = 1):
+    """Add to a named counter (ignored when disabled)."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + value
+
+def instrumented(func: Callable, name: str) -> Callable:
+    """
+    Wrap a function so every call is timed under `name`.
+    Returns func itself when disabled, so hot call sites pay nothing.
+    """
+    if not _enabled:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            add_time(name, time.perf_counter() - start)
+    return wrapper
+
+def timed(name: str, func: Callable, *args, **kwargs):
+    """Call func(*args, **kwargs) inside timer(name) (picklable, for process pools)."""
+    with timer(name):
+        return func(*args, **kwargs)
+
+def snapshot() -> Dict:
+    """Collected timers and counters, plus the derived per-second rates."""
+    rates = {}
+    for rate, (counter, section) in RATES.items():
+        if counter in _counters and _timers.get(section, [0, 0.0])[1] > 0:
+            rates[rate] = _counters[counter] / _timers[section][1]
+    return {
+        'timers': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in _timers.items()},
+        'counters': dict(_counters),
+        'rates': rates
+    }
+
+def merge(other: Dict):
+    """Fold a snapshot (e.g. from a worker process) into this process's metrics."""
+    for name, section in other['timers'].items():
+        add_time(name, section['seconds'], section['calls'])
+    for name, value in other['counters'].items():
+        count(name, value)
+
+def collect(func: Callable, *args, **kwargs):
+    """
+    Worker: run func with a fresh registry and return (result, snapshot).
+    Used by submit() and pool_map() so metrics survive the process boundary.
+    """
+    reset()
+    result = func(*args, **kwargs)
+    return result, snapshot()
+
+def submit(pool, func: Callable, *args, **kwargs):
+    """pool.submit that also brings back the worker's metrics when enabled; read it with result()."""
+    if not _enabled:
+        return pool.submit(func, *args, **kwargs)
+    return pool.submit(collect, func, *args, **kwargs)
+
+def result(future):
+    """Result of a future from submit(), merging the worker's metrics into this process."""
+    value = future.result()
+    if not _enabled:
+        return value
+    value, worker_metrics = value
+    merge(worker_metrics)
+    return value
+
+def pool_map(pool, func: Callable, *iterables) -> list:
+    """list(pool.map(func, *iterables)), merging worker metrics when enabled."""
+    if not _enabled:
+        return list(pool.map(func, *iterables))
+    outputs = []
+    for value, worker_metrics in pool.map(collect, repeat(func), *iterables):
+        merge(worker_metrics)
+        outputs.append(value)
+    return outputs
+
+def to_prometheus(metrics: Dict) -> str:
+    """Render a snapshot in the Prometheus text exposition format."""
+    lines = [
+        '# HELP captive_section_seconds_total Wall-clock seconds spent in each timed section',
+        '# TYPE captive_section_seconds_total counter'
+    ]
+    lines += [f'captive_section_seconds_total{{section="{name}"}} {section["seconds"]:.6f}'
+              for name, section in sorted(metrics['timers'].items())]
+    lines += ['# HELP captive_section_calls_total Times each timed section was entered',
+              '# TYPE captive_section_calls_total counter']
+    lines += [f'captive_section_calls_total{{section="{name}"}} {section["calls"]}'
+              for name, section in sorted(metrics['timers'].items())]
+    lines += ['# HELP captive_count_total Work counted by the simulations (paths, events, units)',
+              '# TYPE captive_count_total counter']
+    lines += [f'captive_count_total{{counter="{name}"}} {value}'
+              for name, value in sorted(metrics['counters'].items())]
+    lines += ['# HELP captive_rate_per_second Throughput derived from counters and section times',
+              '# TYPE captive_rate_per_second gauge']
+    lines += [f'captive_rate_per_second{{rate="{name}"}} {value:.3f}'
+              for name, value in sorted(metrics['rates'].items())]
+    return '\n'.join(lines) + '\n'
+
+def write_metrics(path: str) -> str:
+    """
+    Write the collected metrics: Prometheus text for a .prom file, JSON otherwise.
+
+    :return: Path written
+    """
+    metrics = snapshot()
+    with open(path, 'w') as f:
+        if path.endswith('.prom'):
+            f.write(to_prometheus(metrics))
+        else:
+            json.dump(metrics, f, indent=2, sort_keys=True)
+            f.write('\n')
+    return path
+
+@contextlib.contextmanager
+def profile(path: str = None, sort: str = 'cumulative', top: int = 25):
+    """
+    Profile a block with cProfile and save the stats to `path` (a no-op without a path).
+    Load the file with pstats or snakeviz; the top entries are also printed.
+    """
+    if not path:
+        yield
+        return
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        pstats.Stats(profiler).sort_stats(sort).print_stats(top)
@@ -2,29 +2,42 @@
 """
 Main runner script for the Integral Mass Captive Insurance simulation.
 Orchestrates all simulations and generates outputs for the website.
+
+Usage:
+    python main.py [report] [--force ...]          # every stage plus the summary report
+    python main.py mc --sims 5000 --years 10       # Monte Carlo stage only
+    python main.py queue --days 365 --units 60     # queuing stage only
+    python main.py instrument --months 180         # financial instrument stage only
+
+Heavy libraries (pandas, matplotlib, SciPy, SimPy) are imported inside the stages that
+use them, so `python main.py --help` starts instantly.
 """
 import os
 import sys
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend for server use
+from stage_cache import StageCache, source_hash, stage_key
+import instrumentation
 
-from financial_instrument import MultigenEquityInstrument
-from queue_sim import run_simulation as run_queue_sim
-from risk_model import CaptiveInsuranceModel, generate_summary_statistics
-from actors import MarketType
+# Format for exported result tables: parquet, feather, npz or csv (default: results_io.default_format())
+RESULTS_FORMAT = os.environ.get('CAPTIVE_RESULTS_FORMAT')
 
-# Ensure output directories exist
-os.makedirs('../docs/assets', exist_ok=True)
-os.makedirs('../data', exist_ok=True)
+# Stages to rebuild even if their inputs are unchanged (comma-separated names, or 'all')
+FORCE_REBUILD = [name for name in os.environ.get('CAPTIVE_FORCE_REBUILD', '').split(',') if name]
 
-def run_financial_instrument_analysis():
+# Processes for the concurrent stage run (1 runs the stages one after another in this process)
+STAGE_WORKERS = int(os.environ.get('CAPTIVE_STAGE_WORKERS', '3'))
+
+def compute_financial_instrument(seed=None, months=180):
     """
     Run the multi-generational equity instrument simulation.
-    Generates comparison graphs showing scenarios with/without insurance.
+    Simulates the payment scenarios with and without insurance.
     """
+    from financial_instrument import MultigenEquityInstrument
+    
+    rng = random.Random(seed)
     print("\n" + "="*60)
     print("FINANCIAL INSTRUMENT ANALYSIS")
     print("="*60)
@@ -32,33 +45,59 @@ def run_financial_instrument_analysis():
     # Scenario A: Perfect payments (baseline)
     print("\nScenario A: Perfect Payments (No Risk Events)")
     plan_a = MultigenEquityInstrument(150000, 1200, 0.045, datetime.now())
-    for month in range(180):  # 15 years
+    for month in range(months):  # 15 years by default
         plan_a.process_month(risk_event_occurred=False)
     
     # Scenario B: Random risk events WITHOUT insurance
     print("Scenario B: Risk Events WITHOUT Insurance Coverage")
     plan_b = MultigenEquityInstrument(150000, 1200, 0.045, datetime.now())
-    import random
-    for month in range(180):
-        risk_event = random.random() < 0.05  # 5% chance of missed payment
+    for month in range(months):
+        risk_event = rng.random() < 0.05  # 5% chance of missed payment
         plan_b.process_month(risk_event_occurred=risk_event)
     
     # Scenario C: Random risk events WITH insurance (insurance covers gaps)
     print("Scenario C: Risk Events WITH Insurance Coverage")
     plan_c = MultigenEquityInstrument(150000, 1200, 0.045, datetime.now())
-    for month in range(180):
-        risk_event = random.random() < 0.05
+    for month in range(months):
+        risk_event = rng.random() < 0.05
         # Insurance covers the payment, so we process as if no risk occurred
         plan_c.process_month(risk_event_occurred=False)
     
+    return {
+        'df_a': plan_a.export_data(),
+        'df_b': plan_b.export_data(),
+        'df_c': plan_c.export_data(),
+        'scenario_a_final_equity': plan_a.vested_equity_percent * 100,
+        'scenario_b_final_equity': plan_b.vested_equity_percent * 100,
+        'scenario_c_final_equity': plan_c.vested_equity_percent * 100
+    }
+
+def render_financial_instrument(data, results_format=None):
+    """
+    Export the scenario data.
+    """
+    from results_io import write_results
+    write_results(data['df_a'], '../data/scenario_a_perfect', results_format)
+    write_results(data['df_b'], '../data/scenario_b_no_insurance', results_format)
+    write_results(data['df_c'], '../data/scenario_c_with_insurance', results_format)
+    
+    return {key: value for key, value in data.items() if key.endswith('_final_equity')}
+
+def financial_instrument_plot_data(data):
+    """Month, equity vested and balance arrays of each scenario."""
+    return {scenario: {column: data[scenario][column].to_numpy() for column in ('month', 'vesting_percent', 'balance')}
+            for scenario in ('df_a', 'df_b', 'df_c')}
+
+def draw_financial_instrument(plt, plot):
+    """
+    Comparison graphs showing scenarios with/without insurance.
+    """
+    df_a, df_b, df_c = plot['df_a'], plot['df_b'], plot['df_c']
+    
     # Generate comparison graph
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
     
     # Plot 1: Equity Vesting Over Time
-    df_a = plan_a.export_data()
-    df_b = plan_b.export_data()
-    df_c = plan_c.export_data()
-    
     ax1.plot(df_a['month'], df_a['vesting_percent'], 
              label='Scenario A: Perfect Payments', linewidth=2, color='green')
     ax1.plot(df_b['month'], df_b['vesting_percent'], 
@@ -88,63 +127,98 @@ def run_financial_instrument_analysis():
     ax2.grid(True, alpha=0.3)
     ax2.axhline(y=150000, color='black', linestyle=':', alpha=0.5, label='Asset Value')
     
-    plt.tight_layout()
-    plt.savefig('../docs/assets/financial_instrument_comparison.png', dpi=150, bbox_inches='tight')
-    print("✓ Saved: docs/assets/financial_instrument_comparison.png")
-    
-    # Export data
-    df_a.to_csv('../data/scenario_a_perfect.csv', index=False)
-    df_b.to_csv('../data/scenario_b_no_insurance.csv', index=False)
-    df_c.to_csv('../data/scenario_c_with_insurance.csv', index=False)
-    
-    return {
-        'scenario_a_final_equity': plan_a.vested_equity_percent * 100,
-        'scenario_b_final_equity': plan_b.vested_equity_percent * 100,
-        'scenario_c_final_equity': plan_c.vested_equity_percent * 100
-    }
+    fig.tight_layout()
+    return fig
 
-def run_queue_analysis():
+def compute_queue(seed=None, simulation_days=365, units_per_market=60, num_replications=100):
     """
-    Run the queuing simulation for GC resource allocation.
+    Run the queuing simulation for GC resource allocation, with the GCs in
+    data/GC_roster.csv and risk events from data/risk_tables.csv.
     """
+    from claim_tables import GC_ROSTER_PATH, load_claim_tables, load_gc_roster
+    from queue_sim import run_simulation as run_queue_sim, run_replications
+    
     print("\n" + "="*60)
     print("QUEUING SIMULATION ANALYSIS")
     print("="*60)
     
+    # Table-driven risk events need the heap backend
+    claim_tables = load_claim_tables()
+    
     # Increased units to create more realistic queuing behavior
-    results = run_queue_sim(simulation_days=365, units_per_market=60)
+    results = run_queue_sim(simulation_days=simulation_days, units_per_market=units_per_market,
+                            gc_roster=load_gc_roster(GC_ROSTER_PATH), seed=seed,
+                            backend='heap', claim_tables=claim_tables)
+    
+    # Independent replications for confidence intervals on the headline figures
+    print(f"Running up to {num_replications} replications for confidence intervals...")
+    replications = run_replications(num_replications=num_replications, simulation_days=simulation_days,
+                                    units_per_market=units_per_market,
+                                    seed=seed, target_half_width=2.0, backend='heap',
+                                    roster_path=GC_ROSTER_PATH, claim_tables=claim_tables)
+    results['replication_statistics'] = replications['statistics']
+    results['num_replications'] = replications['num_replications']
+    return results
+
+def render_queue(results, results_format=None):
+    """
+    Export the event logs.
+    """
+    from results_io import write_results
+    
+    # Event logs are columnar; markets and risk types are already categorical labels
+    write_results(results['completed_units'].to_frame(), '../data/completed_units', results_format)
+    write_results(results['risk_events'].to_frame(), '../data/risk_events', results_format)
+    
+    # The report only needs the replication statistics
+    return {key: results[key] for key in ('replication_statistics', 'num_replications')}
+
+def queue_plot_data(results):
+    """Jobs per GC, a pre-binned wait time histogram and event counts per market."""
+    import numpy as np
+    from actors import MarketType
+    from reporting import histogram
+    markets = list(MarketType)
+    return {
+        'gc_ids': list(results['gc_utilization'].keys()),
+        'jobs': list(results['gc_utilization'].values()),
+        'wait_histogram': histogram(results['waiting_times'], bins=30) if len(results['waiting_times']) else None,
+        'avg_wait_time': results['avg_wait_time'],
+        'markets': [market.value for market in markets],
+        'risk_events': np.bincount(results['risk_events'].column('market'), minlength=len(markets)),
+        'completions': np.bincount(results['completed_units'].column('market'), minlength=len(markets))
+    }
+
+def draw_queue(plt, plot):
+    """
+    GC utilization, wait times and risk events.
+    """
+    from reporting import draw_histogram
     
     # Create visualizations
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 10))
     
     # Plot 1: GC Utilization
-    gc_ids = list(results['gc_utilization'].keys())
-    jobs = list(results['gc_utilization'].values())
-    
-    ax1.bar(gc_ids, jobs, color='steelblue')
+    ax1.bar(plot['gc_ids'], plot['jobs'], color='steelblue')
     ax1.set_xlabel('General Contractor ID', fontsize=11)
     ax1.set_ylabel('Jobs Completed', fontsize=11)
     ax1.set_title('GC Utilization (Jobs Completed)', fontsize=12, fontweight='bold')
     ax1.grid(True, alpha=0.3, axis='y')
     
     # Plot 2: Wait Time Distribution
-    if results['waiting_times']:
-        ax2.hist(results['waiting_times'], bins=30, color='coral', edgecolor='black', alpha=0.7)
+    if plot['wait_histogram'] is not None:
+        draw_histogram(ax2, plot['wait_histogram'], color='coral', edgecolor='black', alpha=0.7)
         ax2.set_xlabel('Wait Time (days)', fontsize=11)
         ax2.set_ylabel('Frequency', fontsize=11)
-        ax2.set_title(f"Wait Time Distribution (Avg: {results['avg_wait_time']:.1f} days)", 
+        ax2.set_title(f"Wait Time Distribution (Avg: {plot['avg_wait_time']:.1f} days)", 
                      fontsize=12, fontweight='bold')
         ax2.grid(True, alpha=0.3, axis='y')
     
     # Plot 3: Risk Events by Market
-    risk_by_market = {}
-    for event in results['risk_events']:
-        market = event['market'].value
-        risk_by_market[market] = risk_by_market.get(market, 0) + 1
+    risk_by_market = [(market, count) for market, count in zip(plot['markets'], plot['risk_events']) if count > 0]
     
     if risk_by_market:
-        markets = list(risk_by_market.keys())
-        counts = list(risk_by_market.values())
+        markets, counts = zip(*risk_by_market)
         ax3.bar(markets, counts, color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
         ax3.set_xlabel('Market Type', fontsize=11)
         ax3.set_ylabel('Number of Risk Events', fontsize=11)
@@ -152,70 +226,131 @@ def run_queue_analysis():
         ax3.grid(True, alpha=0.3, axis='y')
     
     # Plot 4: Completion Timeline
-    completed_df = pd.DataFrame(results['completed_units'])
-    if not completed_df.empty:
-        # Convert MarketType enum to string for groupby
-        completed_df['market_str'] = completed_df['market'].apply(lambda x: x.value)
-        market_completions = completed_df.groupby('market_str').size()
-        ax4.pie(market_completions.values, labels=market_completions.index,
+    market_completions = [(market, count) for market, count in zip(plot['markets'], plot['completions']) if count > 0]
+    if market_completions:
+        markets, counts = zip(*market_completions)
+        ax4.pie(counts, labels=markets,
                autopct='%1.1f%%', startangle=90, colors=['#FF6B6B', '#4ECDC4', '#45B7D1'])
         ax4.set_title('Units Completed by Market', fontsize=12, fontweight='bold')
     
-    plt.tight_layout()
-    plt.savefig('../docs/assets/queue_simulation_results.png', dpi=150, bbox_inches='tight')
-    print("✓ Saved: docs/assets/queue_simulation_results.png")
-    
-    # Export data
-    completed_df_export = pd.DataFrame(results['completed_units'])
-    if not completed_df_export.empty:
-        completed_df_export['market'] = completed_df_export['market'].apply(lambda x: x.value)
-    completed_df_export.to_csv('../data/completed_units.csv', index=False)
-    
-    risk_events_df = pd.DataFrame(results['risk_events'])
-    if not risk_events_df.empty:
-        risk_events_df['market'] = risk_events_df['market'].apply(lambda x: x.value)
-        risk_events_df['risk_type'] = risk_events_df['risk_type'].apply(lambda x: x.value)
-    risk_events_df.to_csv('../data/risk_events.csv', index=False)
-    
-    return results
+    fig.tight_layout()
+    return fig
 
-def run_monte_carlo_analysis():
+def compute_monte_carlo(seed=None, num_simulations=5_000, years=10, export_paths=False):
     """
     Run the Monte Carlo risk simulation.
+    
+    Results stream into running aggregates (MonteCarloSummary) that hold the statistics,
+    the final capital distribution and a few sample paths for the figures. The
+    (simulation, year) table is only built when export_paths is set.
+    
+    :param export_paths: Also keep the full results DataFrame for export
     """
+    from aggregates import MonteCarloSummary, frame_to_paths
+    from reporting import histogram
+    from risk_model import CaptiveInsuranceModel, generate_summary_statistics
+    
     print("\n" + "="*60)
     print("MONTE CARLO RISK ANALYSIS")
     print("="*60)
     
-    model = CaptiveInsuranceModel(
+    # Claims for the GCs in data/GC_roster.csv, from data/risk_tables.csv
+    model = CaptiveInsuranceModel.from_tables(
         initial_capital=1_000_000,
-        num_gcs=12,
         premium_per_gc_annual=50_000
     )
     
-    print("\nRunning 5,000 simulations over 10 years...")
-    results_df = model.run_monte_carlo(num_simulations=5_000, years=10)
-    stats = generate_summary_statistics(results_df)
+    print(f"\nRunning {num_simulations:,} simulations over {years} years...")
+    results_df = None
+    if export_paths:
+        # Same chunks and seeds as the streaming run, so the aggregates are identical
+        results_df = model.run_monte_carlo(num_simulations=num_simulations, years=years,
+                                          engine='vectorized', seed=seed)
+        summary = MonteCarloSummary(years, sample_paths=20)
+        summary.update(frame_to_paths(results_df))
+    else:
+        summary = model.run_monte_carlo_streaming(num_simulations=num_simulations, years=years,
+                                                  sample_paths=20, seed=seed)
+    
+    solvency = summary.solvency_by_year()
+    capital_values, capital_counts = summary.final_capital_sketch.distribution()
+    return {
+        'results_df': results_df,
+        'stats': generate_summary_statistics(summary),
+        'capital_histogram': histogram(capital_values, bins=50, weights=capital_counts),
+        'solvency_by_year': {'mean': solvency['mean'].to_numpy(), 'std': solvency['std'].to_numpy()},
+        'sample_paths': frame_to_paths(summary.sample_frame)['ending_capital'],
+        'years': years
+    }
+
+def monte_carlo_tables(params):
+    """The full results table is only written when the run exports its paths."""
+    return ['../data/monte_carlo_results'] if params.get('export_paths') else []
+
+def render_monte_carlo(data, results_format=None):
+    """
+    Export the summary statistics, and the results when the run kept them.
+    """
+    from results_io import write_results
+    results_df, stats = data['results_df'], data['stats']
+    
+    # Export data
+    if results_df is not None:
+        path = write_results(results_df, '../data/monte_carlo_results', results_format)
+        print(f"✓ Saved: {path.replace('../', '')}")
+    
+    # Save summary statistics
+    with open('../data/risk_statistics.txt', 'w') as f:
+        f.write("MONTE CARLO SIMULATION RESULTS\n")
+        f.write("="*60 + "\n\n")
+        for key, value in stats.items():
+            if 'capital' in key or 'claims' in key:
+                f.write(f"{key}: ${value:,.2f}\n")
+            elif 'probability' in key or 'ratio' in key:
+                f.write(f"{key}: {value:.4f}\n")
+            else:
+                f.write(f"{key}: {value}\n")
+    
+    return stats
+
+def monte_carlo_plot_data(data):
+    """Pre-binned final capital, per-year solvency bands, sample paths and headline capital figures."""
+    stats = data['stats']
+    return {
+        'capital_histogram': data['capital_histogram'],
+        'solvency_by_year': data['solvency_by_year'],
+        'sample_paths': data['sample_paths'],
+        'key_metrics': [stats['mean_final_capital'], stats['percentile_5_capital'],
+                        stats['median_final_capital'], stats['percentile_95_capital']],
+        'years': data['years']
+    }
+
+def draw_monte_carlo(plt, plot):
+    """
+    Capital and solvency distributions.
+    """
+    from reporting import draw_histogram, draw_paths
+    mean_final_capital = plot['key_metrics'][0]
+    year_index = range(plot['years'])
     
     # Create visualizations
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 10))
     
     # Plot 1: Capital Distribution (Final Year)
-    final_years = results_df.groupby('simulation').last()
-    ax1.hist(final_years['ending_capital'] / 1_000_000, bins=50, 
-            color='green', edgecolor='black', alpha=0.7)
-    ax1.axvline(x=stats['mean_final_capital']/1_000_000, color='red', 
-               linestyle='--', linewidth=2, label=f"Mean: ${stats['mean_final_capital']/1e6:.2f}M")
+    draw_histogram(ax1, plot['capital_histogram'], scale=1_000_000,
+                   color='green', edgecolor='black', alpha=0.7)
+    ax1.axvline(x=mean_final_capital/1_000_000, color='red', 
+               linestyle='--', linewidth=2, label=f"Mean: ${mean_final_capital/1e6:.2f}M")
     ax1.set_xlabel('Final Capital ($M)', fontsize=11)
     ax1.set_ylabel('Frequency', fontsize=11)
-    ax1.set_title('Distribution of Final Capital (10 Years)', fontsize=12, fontweight='bold')
+    ax1.set_title(f"Distribution of Final Capital ({plot['years']} Years)", fontsize=12, fontweight='bold')
     ax1.legend()
     ax1.grid(True, alpha=0.3, axis='y')
     
     # Plot 2: Solvency Ratio Over Time
-    yearly_avg = results_df.groupby('year')['solvency_ratio'].agg(['mean', 'std'])
-    ax2.plot(yearly_avg.index, yearly_avg['mean'], linewidth=2, color='blue')
-    ax2.fill_between(yearly_avg.index, 
+    yearly_avg = plot['solvency_by_year']
+    ax2.plot(year_index, yearly_avg['mean'], linewidth=2, color='blue')
+    ax2.fill_between(year_index, 
                      yearly_avg['mean'] - yearly_avg['std'],
                      yearly_avg['mean'] + yearly_avg['std'],
                      alpha=0.3, color='blue')
@@ -226,51 +361,25 @@ def run_monte_carlo_analysis():
     ax2.legend()
     ax2.grid(True, alpha=0.3)
     
-    # Plot 3: Capital Trajectory (Sample Paths)
-    sample_sims = results_df[results_df['simulation'].isin(range(20))]
-    for sim_id in range(20):
-        sim_data = sample_sims[sample_sims['simulation'] == sim_id]
-        ax3.plot(sim_data['year'], sim_data['ending_capital'] / 1_000_000, 
-                alpha=0.5, linewidth=1)
+    # Plot 3: Capital Trajectory (Sample Paths), one LineCollection for all of them
+    draw_paths(ax3, year_index, plot['sample_paths'], scale=1_000_000, alpha=0.5, linewidth=1)
     ax3.set_xlabel('Year', fontsize=11)
     ax3.set_ylabel('Capital ($M)', fontsize=11)
-    ax3.set_title('Sample Capital Trajectories (20 Simulations)', fontsize=12, fontweight='bold')
+    ax3.set_title(f"Sample Capital Trajectories ({len(plot['sample_paths'])} Simulations)",
+                  fontsize=12, fontweight='bold')
     ax3.grid(True, alpha=0.3)
     
     # Plot 4: Risk Metrics Summary
     metrics = ['Mean\nCapital', '5th\nPercentile', 'Median\nCapital', '95th\nPercentile']
-    values = [
-        stats['mean_final_capital'] / 1_000_000,
-        stats['percentile_5_capital'] / 1_000_000,
-        stats['median_final_capital'] / 1_000_000,
-        stats['percentile_95_capital'] / 1_000_000
-    ]
+    values = [value / 1_000_000 for value in plot['key_metrics']]
     colors = ['#4ECDC4', '#FF6B6B', '#45B7D1', '#95E1D3']
     ax4.bar(metrics, values, color=colors, edgecolor='black')
     ax4.set_ylabel('Capital ($M)', fontsize=11)
-    ax4.set_title('Key Risk Metrics (10-Year Horizon)', fontsize=12, fontweight='bold')
+    ax4.set_title(f"Key Risk Metrics ({plot['years']}-Year Horizon)", fontsize=12, fontweight='bold')
     ax4.grid(True, alpha=0.3, axis='y')
     
-    plt.tight_layout()
-    plt.savefig('../docs/assets/monte_carlo_results.png', dpi=150, bbox_inches='tight')
-    print("✓ Saved: docs/assets/monte_carlo_results.png")
-    
-    # Export data
-    results_df.to_csv('../data/monte_carlo_results.csv', index=False)
-    
-    # Save summary statistics
-    with open('../data/risk_statistics.txt', 'w') as f:
-        f.write("MONTE CARLO SIMULATION RESULTS\n")
-        f.write("="*60 + "\n\n")
-        for key, value in stats.items():
-            if 'capital' in key:
-                f.write(f"{key}: ${value:,.2f}\n")
-            elif 'probability' in key or 'ratio' in key:
-                f.write(f"{key}: {value:.4f}\n")
-            else:
-                f.write(f"{key}: {value}\n")
-    
-    return stats
+    fig.tight_layout()
+    return fig
 
 def generate_summary_report(financial_results, queue_results, monte_carlo_stats):
     """
@@ -280,6 +389,8 @@ def generate_summary_report(financial_results, queue_results, monte_carlo_stats)
     print("GENERATING SUMMARY REPORT")
     print("="*60)
     
+    queue_stats = queue_results['replication_statistics']
+    
     report = f"""# Integral Mass Captive Insurance - Simulation Summary
 
 **Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -302,9 +413,11 @@ The multi-generational equity instrument demonstrates strong performance:
 
 Resource allocation across 12 General Contractors:
 
-- **Total Units Completed:** {queue_results['total_units_completed']}
-- **Average Wait Time:** {queue_results['avg_wait_time']:.1f} days
-- **Risk Event Rate:** {queue_results['total_risk_events']/queue_results['total_units_completed']*100:.1f}%
+- **Total Units Completed:** {queue_stats.loc['units_completed', 'mean']:.0f} (95% CI ±{queue_stats.loc['units_completed', 'half_width']:.1f})
+- **Average Wait Time:** {queue_stats.loc['avg_wait_time', 'mean']:.1f} days (95% CI ±{queue_stats.loc['avg_wait_time', 'half_width']:.1f} days)
+- **Risk Event Rate:** {queue_stats.loc['risk_event_rate', 'mean']*100:.1f}% (95% CI ±{queue_stats.loc['risk_event_rate', 'half_width']*100:.1f}%)
+
+*Based on {queue_results['num_replications']} independent replications.*
 
 **Key Finding:** The GC network demonstrates sufficient capacity with manageable wait times across all three market segments.
 
@@ -340,29 +453,253 @@ The Integral Mass Captive Insurance model is actuarially sound and operationally
     print("ALL SIMULATIONS COMPLETE")
     print("="*60)
 
-def main():
+# Pipeline stages: compute and render (export) steps, default parameters (including the
+# seed), the source and data files that feed the cache key, the files written (tables may be a
+# function of the parameters) and the figures, each drawn from plot inputs built by its plot data function
+STAGES = {
+    'financial_instrument': {
+        'compute': compute_financial_instrument,
+        'render': render_financial_instrument,
+        'params': {'seed': 1, 'months': 180},
+        'sources': ['financial_instrument.py'],
+        'tables': ['../data/scenario_a_perfect', '../data/scenario_b_no_insurance',
+                   '../data/scenario_c_with_insurance'],
+        'files': [],
+        'figures': {'../docs/assets/financial_instrument_comparison.png':
+                    (financial_instrument_plot_data, draw_financial_instrument)}
+    },
+    'queue': {
+        'compute': compute_queue,
+        'render': render_queue,
+        'params': {'seed': 2, 'simulation_days': 365, 'units_per_market': 60, 'num_replications': 100},
+        'sources': ['queue_sim.py', 'fast_queue.py', 'actors.py', 'records.py', 'claim_tables.py',
+                    '../data/GC_roster.csv', '../data/risk_tables.csv'],
+        'tables': ['../data/completed_units', '../data/risk_events'],
+        'files': [],
+        'figures': {'../docs/assets/queue_simulation_results.png': (queue_plot_data, draw_queue)}
+    },
+    'monte_carlo': {
+        'compute': compute_monte_carlo,
+        'render': render_monte_carlo,
+        'params': {'seed': 3, 'num_simulations': 5_000, 'years': 10, 'export_paths': False},
+        'sources': ['risk_model.py', 'aggregates.py', 'risk_metrics.py', 'claim_tables.py',
+                    '../data/GC_roster.csv', '../data/risk_tables.csv'],
+        'tables': monte_carlo_tables,
+        'files': ['../data/risk_statistics.txt'],
+        'figures': {'../docs/assets/monte_carlo_results.png': (monte_carlo_plot_data, draw_monte_carlo)}
+    }
+}
+
+def run_pipeline(cache: StageCache, stages=None, overrides=None,
+                 results_format: str = RESULTS_FORMAT, workers: int = STAGE_WORKERS) -> dict:
+    """
+    Run every stage whose inputs changed and reuse cached results for the rest.
+
+    Stale stages compute concurrently, one process each. As each finishes, its result
+    files and each of its figures are written as separate tasks by a background writer
+    pool while the other stages keep computing, so the wall time approaches that of the
+    slowest stage. A figure whose plot inputs are unchanged keeps its existing image
+    (see reporting.render_figure).
+
+    :param cache: Stage cache (updated with every rebuilt stage)
+    :param stages: Names of the stages to run (default: all)
+    :param overrides: Stage name -> parameters replacing that stage's defaults
+    :param results_format: Format for exported tables (default: results_io.default_format())
+    :param workers: Processes for computing stages (1 runs them serially in this process)
+    :return: Dictionary of stage name -> report inputs
+    """
+    from reporting import render_figure, render_figures
+    from results_io import results_path, default_format
+    results_format = results_format or default_format()
+    os.makedirs('../docs/assets', exist_ok=True)
+    os.makedirs('../data', exist_ok=True)
+    
+    here = os.path.dirname(os.path.abspath(__file__))
+    results, pending = {}, {}
+    for name in stages or STAGES:
+        stage = STAGES[name]
+        params = {**stage['params'], **(overrides or {}).get(name, {})}
+        sources = source_hash(stage['compute'], stage['render'], *(func for figure in stage['figures'].values()
+                                                                   for func in figure),
+                              *(os.path.join(here, path) for path in
+                                ['results_io.py', 'reporting.py', *stage['sources']]))
+        key = stage_key(name, {**params, 'results_format': results_format}, sources)
+        if cache.is_fresh(name, key):
+            results[name] = cache.reuse(name, key)
+        else:
+            pending[name] = (key, params)
+
+    def finish(name, result):
+        key, params = pending[name]
+        stage = STAGES[name]
+        results[name] = result
+        tables = stage['tables'](params) if callable(stage['tables']) else stage['tables']
+        artifacts = ([results_path(stem, results_format) for stem in tables] +
+                     stage['files'] + list(stage['figures']))
+        cache.store(name, key, {**params, 'results_format': results_format}, result, artifacts)
+
+    def figure_jobs(name, data):
+        return [(path, draw, plot_data(data)) for path, (plot_data, draw) in STAGES[name]['figures'].items()]
+
+    if workers <= 1 or len(pending) <= 1:
+        for name, (key, params) in pending.items():
+            stage = STAGES[name]
+            data = instrumentation.timed(f'stage.{name}.compute', stage['compute'], **params)
+            report = instrumentation.timed(f'stage.{name}.render', stage['render'], data, results_format)
+            instrumentation.timed(f'stage.{name}.figures', render_figures, figure_jobs(name, data), workers)
+            finish(name, report)
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as compute_pool, \
+         ProcessPoolExecutor(max_workers=max(workers, len(pending))) as writer_pool:
+        computing = {instrumentation.submit(compute_pool, instrumentation.timed, f'stage.{name}.compute',
+                                            STAGES[name]['compute'], **params): name
+                     for name, (key, params) in pending.items()}
+        writing, remaining, reports = {}, {}, {}
+        for future in as_completed(computing):
+            name = computing[future]
+            data = instrumentation.result(future)
+            writing[instrumentation.submit(writer_pool, instrumentation.timed, f'stage.{name}.render',
+                                           STAGES[name]['render'], data, results_format)] = (name, 'render')
+            for job in figure_jobs(name, data):
+                writing[instrumentation.submit(writer_pool, instrumentation.timed, f'stage.{name}.figures',
+                                               render_figure, *job)] = (name, 'figure')
+            remaining[name] = 1 + len(STAGES[name]['figures'])
+        # A stage is stored once its exports and every one of its figures are written
+        for future in as_completed(writing):
+            name, task = writing[future]
+            output = instrumentation.result(future)
+            if task == 'render':
+                reports[name] = output
+            remaining[name] -= 1
+            if remaining[name] == 0:
+                finish(name, reports[name])
+
+    return results
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command-line interface: one subcommand per stage, plus 'report' for the full pipeline."""
+    parser = argparse.ArgumentParser(
+        description="Integral Mass Captive Insurance simulation. "
+                    "Without a subcommand, runs every stage and writes the summary report "
+                    "(options given without a subcommand apply to 'report')."
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--format', choices=['parquet', 'feather', 'npz', 'csv'], default=RESULTS_FORMAT,
+                        help="Format for exported result tables (default: parquet if pyarrow is installed)")
+    common.add_argument('--workers', type=int, default=STAGE_WORKERS,
+                        help="Processes for running stages concurrently (1 = serial)")
+    common.add_argument('--force', action='store_true',
+                        help="Rebuild even if the stage cache says the outputs are up to date")
+    common.add_argument('--metrics', metavar='PATH',
+                        help="Collect stage and hot-loop timings and write them here "
+                             "(Prometheus text for .prom, otherwise JSON)")
+    common.add_argument('--profile', metavar='PATH',
+                        help="Run the stages serially under cProfile and save the stats here")
+    
+    subcommands = parser.add_subparsers(dest='command')
+    subcommands.add_parser('report', parents=[common],
+                           help="Run every stage (reusing cached ones) and write the summary report")
+    
+    mc = subcommands.add_parser('mc', parents=[common], help="Monte Carlo solvency analysis")
+    mc.add_argument('--sims', type=int, default=5_000, help="Number of simulations")
+    mc.add_argument('--years', type=int, default=10, help="Years per simulation")
+    mc.add_argument('--seed', type=int, default=STAGES['monte_carlo']['params']['seed'])
+    mc.add_argument('--export-paths', action='store_true',
+                    help="Also write every (simulation, year) row to data/monte_carlo_results")
+    
+    queue = subcommands.add_parser('queue', parents=[common], help="GC installation queue simulation")
+    queue.add_argument('--days', type=int, default=365, help="Days to simulate")
+    queue.add_argument('--units', type=int, default=60, help="Units to install per market")
+    queue.add_argument('--replications', type=int, default=100,
+                       help="Maximum replications for confidence intervals")
+    queue.add_argument('--seed', type=int, default=STAGES['queue']['params']['seed'])
+    
+    instrument = subcommands.add_parser('instrument', parents=[common],
+                                        help="Multi-generational equity instrument scenarios")
+    instrument.add_argument('--months', type=int, default=180, help="Months to simulate")
+    instrument.add_argument('--seed', type=int, default=STAGES['financial_instrument']['params']['seed'])
+    
+    parser.set_defaults(command='report', format=RESULTS_FORMAT, workers=STAGE_WORKERS, force=False,
+                        metrics=None, profile=None)
+    return parser
+
+def run_stage_command(args) -> dict:
+    """Run the single stage selected by an 'mc', 'queue' or 'instrument' command."""
+    name, params = {
+        'mc': ('monte_carlo', lambda: {'seed': args.seed, 'num_simulations': args.sims, 'years': args.years,
+                                       'export_paths': args.export_paths}),
+        'queue': ('queue', lambda: {'seed': args.seed, 'simulation_days': args.days,
+                                    'units_per_market': args.units, 'num_replications': args.replications}),
+        'instrument': ('financial_instrument', lambda: {'seed': args.seed, 'months': args.months})
+    }[args.command]
+    
+    cache = StageCache(force=FORCE_REBUILD + ([name] if args.force else []))
+    result = run_pipeline(cache, stages=[name], overrides={name: params()},
+                          results_format=args.format, workers=args.workers)[name]
+    cache.save_manifest()
+    return result
+
+def run_command(args):
+    """Run the command parsed from the command line."""
+    if args.command != 'report':
+        result = run_stage_command(args)
+        if args.command == 'queue':
+            print("\n" + result['replication_statistics'].to_string(float_format=lambda value: f"{value:.3f}"))
+        else:
+            for key, value in result.items():
+                print(f"{key}: {value:,.4f}")
+        return
+    
+    # Run the stages concurrently, reusing previous outputs when a stage's inputs are unchanged
+    cache = StageCache(force=FORCE_REBUILD + (['all'] if args.force else []))
+    results = run_pipeline(cache, results_format=args.format, workers=args.workers)
+    cache.save_manifest()
+    
+    # Generate summary
+    generate_summary_report(results['financial_instrument'], results['queue'], results['monte_carlo'])
+    
+    print("\nAll outputs saved to:")
+    print("  - docs/assets/       (graphs for website)")
+    print("  - data/              (result tables)")
+    print("  - docs/              (summary report)")
+    print("  - data/manifest.json (stages rebuilt by this run)")
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parse the command line. Options without a subcommand (`main.py --force`) apply to
+    'report', so bare main.py accepts every option `main.py report` does.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0].startswith('-') and argv[0] not in ('-h', '--help'):
+        argv = ['report', *argv]
+    return build_parser().parse_args(argv)
+
+def main(argv=None):
     """
     Main execution function.
     """
+    args = parse_args(argv)
+    if args.metrics:
+        instrumentation.enable()
+    if args.profile:
+        # A single process, so the profile covers every stage
+        args.workers = 1
+    
     print("\n" + "="*60)
     print("INTEGRAL MASS CAPTIVE INSURANCE SIMULATION")
     print("="*60)
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     try:
-        # Run all simulations
-        financial_results = run_financial_instrument_analysis()
-        queue_results = run_queue_analysis()
-        monte_carlo_stats = run_monte_carlo_analysis()
-        
-        # Generate summary
-        generate_summary_report(financial_results, queue_results, monte_carlo_stats)
+        with instrumentation.profile(args.profile):
+            run_command(args)
         
         print(f"\nCompleted: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("\nAll outputs saved to:")
-        print("  - docs/assets/       (graphs for website)")
-        print("  - data/              (CSV data files)")
-        print("  - docs/              (summary report)")
+        if args.metrics:
+            print(f"✓ Saved metrics: {instrumentation.write_metrics(args.metrics)}")
+        if args.profile:
+            print(f"✓ Saved profile: {args.profile}")
         
     except Exception as e:
         print(f"\n❌ ERROR: {str(e)}")
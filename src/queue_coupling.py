@@ -0,0 +1,238 @@
+#!/usr/bin/env python3.10
+"""
+Couples the installation queue to the Monte Carlo claims engine.
+
+Queue replications (heap backend, table-driven risk events) are run once and reduced to a
+surrogate: per-GC annual risk-event counts and, per GC, the mix of (risk type, market)
+cells its events fall in. Monte Carlo years then resample those counts and draw severities
+from the risk tables, so thousands of coupled years cost no more than table-driven claims
+and the queue is never rerun per path.
+"""
+import math
+import os
+import random
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, TYPE_CHECKING
+import instrumentation
+from actors import RiskType
+from claim_tables import (AliasTable, ClaimTables, RISK_TABLES_PATH, GC_ROSTER_PATH, MARKETS, RISK_TYPES,
+                          load_claim_tables, load_gc_roster, market_codes)
+from queue_sim import ARRIVAL_RATES
+
+if TYPE_CHECKING:
+    from stage_cache import StageCache
+
+# Frequency models: resample whole replication-years (keeps the dependence between GCs
+# that share one queue) or independent Poisson counts at each GC's fitted rate
+FREQUENCIES = ('empirical', 'poisson')
+
+DAYS_PER_YEAR = 365
+
+# Risk type code in the queue's risk event log (list(RiskType)) -> index into RISK_TYPES
+_RISK_INDEX = np.array([RISK_TYPES.index(risk) if risk in RISK_TYPES else -1 for risk in RiskType])
+
+class QueueClaimSurrogate:
+    """
+    Fitted frequency/severity claim model from queue replications.
+
+    annual_counts holds one row of per-GC risk-event counts per simulated queue year.
+    Each GC's claims fall in (risk type, market) cells with the frequencies observed in
+    the queue, and a claim's severity is a normal draw floored at zero with that cell's
+    parameters from the risk tables.
+    """
+
+    def __init__(self, annual_counts: np.ndarray, cell_counts: np.ndarray, claim_tables: ClaimTables,
+                 gc_markets: np.ndarray, frequency: str = 'empirical'):
+        """
+        :param annual_counts: (queue years, GCs) risk events per GC and year
+        :param cell_counts: (GCs, risk types * markets) events per GC and cell
+        :param claim_tables: Tables giving each cell's severity parameters
+        :param gc_markets: Market code of each GC, for GCs with no observed events
+        :param frequency: One of FREQUENCIES
+        """
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency model '{frequency}'. Choose from {FREQUENCIES}")
+        self.annual_counts = annual_counts
+        self.cell_counts = cell_counts
+        self.claim_tables = claim_tables
+        self.frequency = frequency
+        self.rates = annual_counts.mean(axis=0)
+
+        weights = cell_counts.astype(float)
+        for gc in np.flatnonzero(weights.sum(axis=1) == 0):
+            # A GC without events never claims; its market's tabled mix keeps its alias row valid
+            weights[gc, np.arange(len(RISK_TYPES)) * len(MARKETS) + gc_markets[gc]] = \
+                claim_tables.base_probability[:, gc_markets[gc]]
+        self.cell_alias = AliasTable(weights)
+
+        cell_means = claim_tables.severity_mean.ravel()
+        self.mean_severity = (weights / weights.sum(axis=1, keepdims=True)) @ cell_means
+
+    @property
+    def num_gcs(self) -> int:
+        return self.annual_counts.shape[1]
+
+    @property
+    def expected_annual_claims(self) -> float:
+        """Expected claims per year across all GCs (severity floor ignored)."""
+        return float(self.rates @ self.mean_severity)
+
+    def _cell_severities(self, cells: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        risks, markets = np.divmod(cells, len(MARKETS))
+        return self.claim_tables.sample_severities(risks, markets, rng)
+
+    def draw_claims(self, num_simulations: int, years: int, rng: np.random.Generator):
+        """
+        Draw claims for every (simulation, year) at once.
+
+        :return: Tuple of (total_claims, num_claims) arrays shaped (simulations, years)
+        """
+        if self.frequency == 'empirical':
+            counts = self.annual_counts[rng.integers(len(self.annual_counts), size=(num_simulations, years))]
+        else:
+            counts = rng.poisson(self.rates, size=(num_simulations, years, self.num_gcs))
+
+        # One entry per claim: the GC that made it and the (simulation, year) cell it belongs to
+        counts = counts.reshape(-1, self.num_gcs)
+        claim_gcs = np.repeat(np.tile(np.arange(self.num_gcs), len(counts)), counts.ravel())
+        claim_years = np.repeat(np.arange(len(counts)), counts.sum(axis=1))
+        severity = self._cell_severities(self.cell_alias.sample(claim_gcs, rng), rng)
+
+        total_claims = np.bincount(claim_years, weights=severity, minlength=len(counts))
+        return (total_claims.reshape(num_simulations, years),
+                counts.sum(axis=1).reshape(num_simulations, years))
+
+    def draw_year(self):
+        """
+        Scalar draw of one year's claims with the random module and np.random (like simulate_year).
+
+        :return: Tuple of (total_claims, num_claims)
+        """
+        if self.frequency == 'empirical':
+            counts = self.annual_counts[random.randrange(len(self.annual_counts))]
+        else:
+            counts = np.random.poisson(self.rates)
+
+        total_claims, num_claims = 0.0, 0
+        for gc, count in enumerate(counts.tolist()):
+            for _ in range(count):
+                risk, market = divmod(self.cell_alias.sample_one(gc), len(MARKETS))
+                total_claims += max(0, np.random.normal(self.claim_tables.severity_mean[risk, market],
+                                                        self.claim_tables.severity_std[risk, market]))
+            num_claims += count
+        return total_claims, num_claims
+
+def _replication_counts(seed: int, years: int, warmup_years: int, units_per_market: int,
+                        roster_path: str, claim_tables: ClaimTables):
+    """
+    Worker: run one queue replication and count its risk events per GC, for each year
+    after the warm-up, and per GC and (risk type, market) cell.
+    """
+    from fast_queue import run_simulation_fast
+    roster = load_gc_roster(roster_path)
+    results = run_simulation_fast((warmup_years + years) * DAYS_PER_YEAR, units_per_market, roster,
+                                  seed=seed, claim_tables=claim_tables)
+    position = {gc.id: index for index, gc in enumerate(roster)}
+
+    events = results['risk_events']
+    year = (events.column('time') // DAYS_PER_YEAR).astype(np.int64) - warmup_years
+    kept = year >= 0
+    gcs = np.array([position[gc_id] for gc_id in events.column('gc_id')[kept].tolist()], dtype=np.int64)
+    cells = _RISK_INDEX[events.column('risk_type')[kept]] * len(MARKETS) + events.column('market')[kept]
+
+    annual_counts = np.bincount(year[kept] * len(roster) + gcs,
+                                minlength=years * len(roster)).reshape(years, len(roster))
+    cell_counts = np.bincount(gcs * len(RISK_TYPES) * len(MARKETS) + cells,
+                              minlength=len(roster) * len(RISK_TYPES) * len(MARKETS))
+    return annual_counts, cell_counts.reshape(len(roster), -1)
+
+def fit_queue_surrogate(replications: int = 100,
+                        years_per_replication: int = 2,
+                        warmup_years: int = 1,
+                        frequency: str = 'empirical',
+                        roster_path: str = GC_ROSTER_PATH,
+                        risk_tables_path: str = RISK_TABLES_PATH,
+                        seed: int = None,
+                        workers: int = 1) -> QueueClaimSurrogate:
+    """
+    Run queue replications and fit the claim surrogate to their risk events.
+
+    Each replication simulates warmup_years (discarded, while the empty queue fills)
+    plus years_per_replication years with the roster's GCs and enough arrivals to keep
+    every market supplied, giving replications * years_per_replication queue years.
+
+    :param replications: Independent queue replications
+    :param years_per_replication: Years counted per replication after the warm-up
+    :param warmup_years: Years discarded at the start of each replication
+    :param frequency: One of FREQUENCIES
+    :param roster_path: GC roster CSV
+    :param risk_tables_path: Risk tables CSV
+    :param seed: Optional master seed for reproducible runs
+    :param workers: Number of worker processes
+    :return: Fitted QueueClaimSurrogate
+    """
+    claim_tables = load_claim_tables(risk_tables_path)
+    days = (warmup_years + years_per_replication) * DAYS_PER_YEAR
+    units_per_market = math.ceil(1.2 * days / min(ARRIVAL_RATES.values()))
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(replications)]
+    args = (seeds, [years_per_replication] * replications, [warmup_years] * replications,
+            [units_per_market] * replications, [roster_path] * replications, [claim_tables] * replications)
+
+    with instrumentation.timer('coupling.fit'):
+        if workers == 1:
+            outputs = list(map(_replication_counts, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+                outputs = instrumentation.pool_map(pool, _replication_counts, *args)
+
+    annual_counts = np.concatenate([counts for counts, _ in outputs])
+    cell_counts = sum(cells for _, cells in outputs)
+    return QueueClaimSurrogate(annual_counts, cell_counts, claim_tables,
+                               market_codes(load_gc_roster(roster_path)), frequency)
+
+def load_queue_surrogate(cache: 'StageCache' = None, **params) -> QueueClaimSurrogate:
+    """
+    Fitted surrogate, reused from the stage cache when the replication settings, the
+    roster and risk tables and the queue code are unchanged.
+
+    :param cache: Stage cache to reuse and store the surrogate in (None always refits)
+    :param params: fit_queue_surrogate arguments (JSON-serialisable)
+    """
+    if cache is None:
+        return fit_queue_surrogate(**params)
+    from stage_cache import source_hash
+    here = os.path.dirname(os.path.abspath(__file__))
+    settings = {'roster_path': GC_ROSTER_PATH, 'risk_tables_path': RISK_TABLES_PATH, **params}
+    sources = source_hash(*(os.path.join(here, path) for path in
+                            ['queue_coupling.py', 'fast_queue.py', 'queue_sim.py', 'actors.py', 'claim_tables.py']),
+                          settings['roster_path'], settings['risk_tables_path'])
+    return cache.run('queue_surrogate', fit_queue_surrogate, settings, [], sources)
+
+def surrogate_summary(surrogate: QueueClaimSurrogate) -> Dict:
+    """Headline figures of a fitted surrogate."""
+    counts = surrogate.annual_counts.sum(axis=1)
+    return {
+        'queue_years': len(surrogate.annual_counts),
+        'claims_per_year': float(counts.mean()),
+        'claims_per_year_std': float(counts.std(ddof=1)),
+        'expected_annual_claims': surrogate.expected_annual_claims
+    }
+
+if __name__ == "__main__":
+    import time
+    from risk_model import CaptiveInsuranceModel
+
+    print("Fitting queue claim surrogate...")
+    print("=" * 60)
+    start = time.perf_counter()
+    surrogate = fit_queue_surrogate(seed=0)
+    print(f"Fitted in {time.perf_counter() - start:.2f}s: {surrogate_summary(surrogate)}")
+
+    model = CaptiveInsuranceModel.from_queue(surrogate, initial_capital=1_000_000, premium_per_gc_annual=50_000)
+    start = time.perf_counter()
+    summary = model.run_monte_carlo_streaming(num_simulations=10_000, years=10, seed=0)
+    print(f"10,000 coupled paths x 10 years in {time.perf_counter() - start:.2f}s")
+    print(f"Probability of ruin: {summary.ruin_probability:.2%}")
+    # Premium income net of 10% expenses has to cover the queue's expected claims
+    print(f"Break-even premium per GC: ${surrogate.expected_annual_claims / (0.9 * model.num_gcs):,.0f}")
@@ -3,29 +3,203 @@
 Queuing simulation for General Contractor resource allocation.
 Uses SimPy to model the installation process across three markets.
 """
+import heapq
+import os
 import simpy
 import random
-from typing import List, Dict
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional
+import instrumentation
 from actors import GeneralContractor, PrefabUnit, MarketType, RiskType, create_gc_roster
+from records import ColumnarRecorder, COMPLETED_UNIT_SCHEMA, RISK_EVENT_SCHEMA
+
+# Average days between unit arrivals in each market
+ARRIVAL_RATES = {
+    MarketType.STUDENT: 1.5,    # New unit every 1.5 days on average
+    MarketType.MULTIGEN: 2.0,   # New unit every 2 days
+    MarketType.RURAL: 3.0       # New unit every 3 days
+}
+
+# Typical installation time in days for each market (before random variation)
+INSTALLATION_TIMES = {
+    MarketType.STUDENT: 30,
+    MarketType.MULTIGEN: 45,
+    MarketType.RURAL: 60
+}
+INSTALLATION_TIME_VARIATION = (-5, 10)
+
+# Extra days (inclusive range) added by each type of risk event
+RISK_DELAYS = {
+    RiskType.CONSTRUCTION_DEFECT: (5, 15),
+    RiskType.UTILITY_FAILURE: (3, 10),
+    RiskType.SCHEDULE_DELAY: (7, 20)
+}
+
+class GCAvailabilityIndex:
+    """
+    Availability index over a GC roster for O(log n) contractor selection.
+    
+    Keeps one heap of available GCs per specialization plus a global heap, both
+    ordered by skill level, and a heap of GCs ordered by current job count. The
+    heaps are updated incrementally when a GC starts or completes a job; entries
+    that have gone stale are discarded lazily when they reach the top. Call close()
+    when the run ends, so a reused roster stops notifying the index.
+    """
+    
+    def __init__(self, gc_roster: List[GeneralContractor]):
+        self._gcs = {gc.id: gc for gc in gc_roster}
+        # Roster position breaks ties the same way max()/min() over the roster list does
+        self._position = {gc.id: position for position, gc in enumerate(gc_roster)}
+        self._specialists = {market: [] for market in MarketType}
+        self._available = []
+        self._in_heap = {market: set() for market in MarketType}
+        self._in_available = set()
+        self._load = []
+        self._version = {gc.id: 0 for gc in gc_roster}
+        
+        for gc in gc_roster:
+            gc.listeners.append(self.update)
+            self.update(gc)
+    
+    def close(self):
+        """Unsubscribe from the roster's job count changes."""
+        for gc in self._gcs.values():
+            if self.update in gc.listeners:
+                gc.listeners.remove(self.update)
+    
+    def update(self, gc: GeneralContractor):
+        """Record a change in a GC's job count (called by GeneralContractor)."""
+        self._version[gc.id] += 1
+        heapq.heappush(self._load, (gc.current_jobs, self._position[gc.id], self._version[gc.id], gc.id))
+        if len(self._load) > 4 * len(self._gcs) + 64:
+            self._load = [entry for entry in self._load if entry[2] == self._version[entry[3]]]
+            heapq.heapify(self._load)
+        
+        if gc.is_available():
+            entry = (-gc.skill_level, self._position[gc.id], gc.id)
+            if gc.id not in self._in_heap[gc.specialization]:
+                self._in_heap[gc.specialization].add(gc.id)
+                heapq.heappush(self._specialists[gc.specialization], entry)
+            if gc.id not in self._in_available:
+                self._in_available.add(gc.id)
+                heapq.heappush(self._available, entry)
+    
+    def _peek_available(self, heap: list, members: set) -> Optional[GeneralContractor]:
+        while heap:
+            gc = self._gcs[heap[0][2]]
+            if gc.is_available():
+                return gc
+            heapq.heappop(heap)
+            members.discard(gc.id)
+        return None
+    
+    def best_specialist(self, market_type: MarketType) -> Optional[GeneralContractor]:
+        """Most skilled available GC specialised in this market, or None."""
+        return self._peek_available(self._specialists[market_type], self._in_heap[market_type])
+    
+    def best_available(self) -> Optional[GeneralContractor]:
+        """Most skilled available GC in any market, or None."""
+        return self._peek_available(self._available, self._in_available)
+    
+    def least_loaded(self) -> GeneralContractor:
+        """GC with the fewest current jobs."""
+        while self._load[0][2] != self._version[self._load[0][3]]:
+            heapq.heappop(self._load)
+        return self._gcs[self._load[0][3]]
+
+class SpecialistFirstPolicy:
+    """
+    Default dispatch policy.
+    
+    An arriving unit goes to the most skilled available specialist for its market,
+    otherwise to the most skilled available GC. A GC that frees up takes the
+    longest-waiting unit from its own market, otherwise from any market.
+    """
+    
+    def select_gc(self, queue: 'InstallationQueue', market_type: MarketType) -> Optional[GeneralContractor]:
+        """Pick an available GC for a newly arrived unit, or None to make it wait."""
+        gc = queue.gc_index.best_specialist(market_type)
+        if gc is None:
+            gc = queue.gc_index.best_available()
+        return gc
+    
+    def select_market(self, queue: 'InstallationQueue', gc: GeneralContractor) -> Optional[MarketType]:
+        """Pick the market queue a GC with free capacity should serve next, or None."""
+        if queue.queued_units(gc.specialization):
+            return gc.specialization
+        return queue.longest_waiting_market()
+
+class FIFOPolicy:
+    """
+    Strict first-come, first-served across all markets, ignoring specialization
+    (an arriving unit still gets the most skilled available GC).
+    """
+    
+    def select_gc(self, queue: 'InstallationQueue', market_type: MarketType) -> Optional[GeneralContractor]:
+        return queue.gc_index.best_available()
+    
+    def select_market(self, queue: 'InstallationQueue', gc: GeneralContractor) -> Optional[MarketType]:
+        return queue.longest_waiting_market()
+
+class SpecialistOnlyPolicy:
+    """
+    Units are only ever installed by GCs specialised in their market.
+    """
+    
+    def select_gc(self, queue: 'InstallationQueue', market_type: MarketType) -> Optional[GeneralContractor]:
+        return queue.gc_index.best_specialist(market_type)
+    
+    def select_market(self, queue: 'InstallationQueue', gc: GeneralContractor) -> Optional[MarketType]:
+        return gc.specialization if queue.queued_units(gc.specialization) else None
+
+# Dispatch policies selectable by name
+DISPATCH_POLICIES = {
+    'specialist_first': SpecialistFirstPolicy,
+    'fifo': FIFOPolicy,
+    'specialist_only': SpecialistOnlyPolicy
+}
+
+def get_dispatch_policy(policy):
+    """Return a dispatch policy instance from a name in DISPATCH_POLICIES or an instance."""
+    if isinstance(policy, str):
+        if policy not in DISPATCH_POLICIES:
+            raise ValueError(f"Unknown dispatch policy '{policy}'. Choose from {tuple(DISPATCH_POLICIES)}")
+        return DISPATCH_POLICIES[policy]()
+    return policy
 
 class InstallationQueue:
     """
     Manages the queuing system for prefab installations.
+    
+    Every GC is its own resource with capacity max_concurrent_jobs. Units that
+    cannot be assigned on arrival wait in a per-market priority queue (ordered by
+    arrival) until a GC with free capacity is dispatched to them.
     """
     
-    def __init__(self, env: simpy.Environment, gc_roster: List[GeneralContractor]):
+    def __init__(self, env: simpy.Environment, gc_roster: List[GeneralContractor],
+                 dispatch_policy='specialist_first'):
         self.env = env
         self.gc_roster = gc_roster
-        # Create a resource pool with limited capacity to force queuing
-        # Use only 4 GCs at a time even though we have 12 (simulates scheduling constraints)
-        self.gc_pool = simpy.Resource(env, capacity=4)
+        self.policy = get_dispatch_policy(dispatch_policy)
+        # Dispatch decisions, timed when instrumentation is enabled
+        self.select_gc = instrumentation.instrumented(self.policy.select_gc, 'queue.select_gc')
+        self.select_market = instrumentation.instrumented(self.policy.select_market, 'queue.select_market')
+        self.gc_index = GCAvailabilityIndex(gc_roster)
+        self.gc_resources = {gc.id: simpy.Resource(env, capacity=gc.max_concurrent_jobs)
+                             for gc in gc_roster}
+        
+        # Waiting units per market: heap of (arrival_time, sequence, unit, assignment event)
+        self.waiting = {market: [] for market in MarketType}
+        self._sequence = 0
         
         # Statistics tracking
-        self.completed_units = []
+        self.completed_units = ColumnarRecorder(COMPLETED_UNIT_SCHEMA)
         self.waiting_times = []
-        self.risk_events = []
-        self.queue_lengths = {market: [] for market in MarketType}
+        self.risk_events = ColumnarRecorder(RISK_EVENT_SCHEMA)
+        self.queue_lengths = {market: [] for market in MarketType}  # (time, length) samples
         self.gc_assignments = {gc.id: 0 for gc in gc_roster}  # Track which GC gets which job
+        self.gc_busy_days = {gc.id: 0.0 for gc in gc_roster}
         
     def find_best_gc(self, market_type: MarketType) -> GeneralContractor:
         """
@@ -33,18 +207,50 @@ class InstallationQueue:
         Prioritizes specialization match and availability.
         """
         # First, try to find a specialist who is available
-        specialists = [gc for gc in self.gc_roster 
-                      if gc.specialization == market_type and gc.is_available()]
-        if specialists:
-            return max(specialists, key=lambda gc: gc.skill_level)
+        gc = self.gc_index.best_specialist(market_type)
+        if gc is not None:
+            return gc
         
         # Otherwise, find any available GC
-        available = [gc for gc in self.gc_roster if gc.is_available()]
-        if available:
-            return max(available, key=lambda gc: gc.skill_level)
+        gc = self.gc_index.best_available()
+        if gc is not None:
+            return gc
         
         # If none available, return the one with fewest jobs
-        return min(self.gc_roster, key=lambda gc: gc.current_jobs)
+        return self.gc_index.least_loaded()
+    
+    def queued_units(self, market_type: MarketType) -> int:
+        """Number of units waiting in a market's queue."""
+        return len(self.waiting[market_type])
+    
+    def longest_waiting_market(self) -> Optional[MarketType]:
+        """Market whose first waiting unit arrived earliest, or None if all queues are empty."""
+        heads = [(queue[0][:2], market) for market, queue in self.waiting.items() if queue]
+        return min(heads, key=lambda head: head[0])[1] if heads else None
+    
+    def _assign(self, unit: PrefabUnit, gc: GeneralContractor):
+        if not unit.assign_contractor(gc):
+            raise RuntimeError(f"{gc.name} has no free capacity for unit {unit.id}")
+        self.gc_assignments[gc.id] += 1
+    
+    def _enqueue(self, unit: PrefabUnit) -> simpy.Event:
+        assigned = self.env.event()
+        heapq.heappush(self.waiting[unit.market_type], (self.env.now, self._sequence, unit, assigned))
+        self._sequence += 1
+        self.queue_lengths[unit.market_type].append((self.env.now, len(self.waiting[unit.market_type])))
+        return assigned
+    
+    def _dispatch(self, gc: GeneralContractor):
+        """Hand a GC with free capacity the next waiting unit(s) chosen by the policy."""
+        while gc.is_available():
+            market = self.select_market(self, gc)
+            if market is None:
+                return
+            _, _, unit, assigned = heapq.heappop(self.waiting[market])
+            self.queue_lengths[market].append((self.env.now, len(self.waiting[market])))
+            # Reserve the GC now so units arriving at the same instant cannot take it
+            self._assign(unit, gc)
+            assigned.succeed(gc)
     
     def installation_process(self, unit: PrefabUnit):
         """
@@ -52,71 +258,62 @@ class InstallationQueue:
         """
         arrival_time = self.env.now
         
-        # Request a GC from the pool (this is where queuing happens)
-        with self.gc_pool.request() as request:
+        # Take a free GC straight away, or wait in the market queue to be dispatched one
+        gc = self.select_gc(self, unit.market_type)
+        if gc is not None:
+            self._assign(unit, gc)
+        else:
+            gc = yield self._enqueue(unit)
+        
+        # Calculate wait time (time spent waiting for a GC to become available)
+        wait_time = self.env.now - arrival_time
+        self.waiting_times.append(wait_time)
+        
+        with self.gc_resources[gc.id].request() as request:
+            # Never blocks: the GC was only assigned because it had free capacity
             yield request
             
-            # Calculate wait time (time spent waiting for any GC to become available)
-            wait_time = self.env.now - arrival_time
-            self.waiting_times.append(wait_time)
-            
-            # Now assign the best available GC
-            gc = self.find_best_gc(unit.market_type)
-            unit.assign_contractor(gc)
-            self.gc_assignments[gc.id] += 1
-            
             # Simulate installation time
             yield self.env.timeout(unit.installation_time_days)
             
             # Check for risk events
             risk_event = unit.simulate_installation()
             if risk_event != RiskType.NONE:
-                self.risk_events.append({
-                    'time': self.env.now,
-                    'unit_id': unit.id,
-                    'market': unit.market_type,
-                    'risk_type': risk_event,
-                    'gc_id': gc.id
-                })
+                self.risk_events.append(self.env.now, unit.id, unit.market_type, risk_event, gc.id)
                 
                 # Risk events add delay
-                if risk_event == RiskType.CONSTRUCTION_DEFECT:
-                    yield self.env.timeout(random.randint(5, 15))
-                elif risk_event == RiskType.UTILITY_FAILURE:
-                    yield self.env.timeout(random.randint(3, 10))
-                elif risk_event == RiskType.SCHEDULE_DELAY:
-                    yield self.env.timeout(random.randint(7, 20))
+                yield self.env.timeout(random.randint(*RISK_DELAYS[risk_event]))
             
             # Complete installation
+            self.gc_busy_days[gc.id] += self.env.now - arrival_time - wait_time
             unit.complete_installation()
-            self.completed_units.append({
-                'unit_id': unit.id,
-                'market': unit.market_type,
-                'completion_time': self.env.now,
-                'wait_time': wait_time,
-                'gc_id': gc.id,
-                'had_risk_event': risk_event != RiskType.NONE
-            })
+            self.completed_units.append(unit.id, unit.market_type, self.env.now,
+                                        wait_time, gc.id, risk_event != RiskType.NONE)
+        
+        # The GC has capacity again: dispatch it to the next waiting unit
+        self._dispatch(gc)
 
 def generate_unit_arrivals(env: simpy.Environment, 
                           queue: InstallationQueue,
                           market_type: MarketType,
                           arrival_rate: float,
-                          total_units: int):
+                          total_units: int,
+                          first_id: int = 0):
     """
     Generates arrivals of prefab units for a specific market.
     
     :param arrival_rate: Average days between arrivals
     :param total_units: Total number of units to generate
+    :param first_id: Id of the market's first unit (ids are unique across markets)
     """
-    unit_id = 0
+    unit_id = first_id
     for _ in range(total_units):
         # Wait for next arrival
         yield env.timeout(random.expovariate(1.0 / arrival_rate))
         
         # Create new unit
         unit = PrefabUnit(
-            id=f"{market_type.value}_{unit_id}",
+            id=unit_id,
             market_type=market_type,
             asset_value=get_market_asset_value(market_type),
             installation_time_days=get_market_installation_time(market_type)
@@ -137,40 +334,67 @@ def get_market_asset_value(market: MarketType) -> float:
 
 def get_market_installation_time(market: MarketType) -> int:
     """Return typical installation time in days for each market type."""
-    times = {
-        MarketType.STUDENT: 30,
-        MarketType.MULTIGEN: 45,
-        MarketType.RURAL: 60
-    }
-    return times[market] + random.randint(-5, 10)
+    return INSTALLATION_TIMES[market] + random.randint(*INSTALLATION_TIME_VARIATION)
 
 def run_simulation(simulation_days: int = 365, 
-                   units_per_market: int = 50) -> Dict:
+                   units_per_market: int = 50,
+                   gc_roster: List[GeneralContractor] = None,
+                   dispatch_policy='specialist_first',
+                   seed: int = None,
+                   backend: str = 'simpy',
+                   claim_tables=None) -> Dict:
     """
     Run the complete queuing simulation.
     
     :param simulation_days: Total days to simulate
     :param units_per_market: Number of units to install per market
+    :param gc_roster: GCs to simulate (default: create_gc_roster())
+    :param dispatch_policy: Name from DISPATCH_POLICIES or a policy instance
+    :param seed: Optional seed for reproducible runs (seeds the random module)
+    :param backend: 'simpy' (process per unit) or 'heap' (fast_queue event heap)
+    :param claim_tables: Compiled risk tables for table-driven risk events (heap backend only)
     :return: Dictionary of simulation results
     """
+    if backend == 'heap':
+        from fast_queue import run_simulation_fast
+        return run_simulation_fast(simulation_days, units_per_market, gc_roster, dispatch_policy, seed,
+                                   claim_tables)
+    if backend != 'simpy':
+        raise ValueError(f"Unknown backend '{backend}'. Choose 'simpy' or 'heap'")
+    if claim_tables is not None:
+        raise ValueError("Table-driven risk events need the 'heap' backend")
+    
+    if seed is not None:
+        random.seed(seed)
+    
     # Setup
     env = simpy.Environment()
-    gc_roster = create_gc_roster()
-    queue = InstallationQueue(env, gc_roster)
+    if gc_roster is None:
+        gc_roster = create_gc_roster()
+    queue = InstallationQueue(env, gc_roster, dispatch_policy)
     
     # Start arrival processes for each market
     # High arrival rates to create realistic queuing and wait times
-    arrival_rates = {
-        MarketType.STUDENT: 1.5,    # New unit every 1.5 days on average
-        MarketType.MULTIGEN: 2.0,   # New unit every 2 days
-        MarketType.RURAL: 3.0       # New unit every 3 days
-    }
-    
-    for market, rate in arrival_rates.items():
-        env.process(generate_unit_arrivals(env, queue, market, rate, units_per_market))
+    # Each market numbers its units from its own block of ids, as in fast_queue.draw_units
+    for market, rate in ARRIVAL_RATES.items():
+        first_id = list(MarketType).index(market) * units_per_market
+        env.process(generate_unit_arrivals(env, queue, market, rate, units_per_market, first_id))
     
     # Run simulation
-    env.run(until=simulation_days)
+    try:
+        with instrumentation.timer('queue.run'):
+            if instrumentation.enabled():
+                # Step manually to count events; same stopping rule as env.run(until=...)
+                events = 0
+                while env.peek() < simulation_days:
+                    env.step()
+                    events += 1
+                instrumentation.count('queue.events', events)
+            else:
+                env.run(until=simulation_days)
+    finally:
+        queue.gc_index.close()
+    instrumentation.count('queue.units_completed', len(queue.completed_units))
     
     # Compile results
     results = {
@@ -178,6 +402,7 @@ def run_simulation(simulation_days: int = 365,
         'risk_events': queue.risk_events,
         'waiting_times': queue.waiting_times,
         'gc_utilization': queue.gc_assignments,  # Use assignments instead
+        'gc_busy_days': queue.gc_busy_days,
         'total_units_completed': len(queue.completed_units),
         'total_risk_events': len(queue.risk_events),
         'avg_wait_time': sum(queue.waiting_times) / len(queue.waiting_times) if queue.waiting_times else 0
@@ -185,6 +410,130 @@ def run_simulation(simulation_days: int = 365,
     
     return results
 
+def summarize_replication(results: Dict, simulation_days: int) -> Dict:
+    """
+    Reduce one run_simulation result to a compact per-replication summary.
+    
+    :param results: Dictionary from run_simulation
+    :param simulation_days: Days the replication covered
+    :return: Dictionary of scalar statistics
+    """
+    completed = results['total_units_completed']
+    return {
+        'units_completed': completed,
+        'avg_wait_time': results['avg_wait_time'],
+        'throughput_per_day': completed / simulation_days,
+        'risk_event_rate': results['total_risk_events'] / completed if completed else 0.0
+    }
+
+def _run_replication(replication: int, seed: int, simulation_days: int,
+                     units_per_market: int, dispatch_policy, backend: str,
+                     roster_path: str = None, claim_tables=None) -> Dict:
+    """Worker: run one seeded replication and return only its summary."""
+    gc_roster = None
+    if roster_path is not None:
+        from claim_tables import load_gc_roster
+        # A fresh roster per replication: GC job counts carry over between runs
+        gc_roster = load_gc_roster(roster_path)
+    results = run_simulation(simulation_days, units_per_market, gc_roster,
+                             dispatch_policy=dispatch_policy, seed=seed, backend=backend,
+                             claim_tables=claim_tables)
+    return {'replication': replication, 'seed': seed,
+            **summarize_replication(results, simulation_days)}
+
+def confidence_interval(values, confidence: float = 0.95) -> Dict:
+    """
+    Student-t confidence interval for the mean of independent replications.
+    
+    :return: Dictionary with mean, std, half_width, ci_low and ci_high
+    """
+    from scipy import stats
+    values = np.asarray(values, dtype=float)
+    mean = values.mean() if values.size else np.nan
+    if values.size < 2:
+        return {'mean': mean, 'std': np.nan, 'half_width': np.inf, 'ci_low': -np.inf, 'ci_high': np.inf}
+    
+    std = values.std(ddof=1)
+    half_width = stats.t.ppf(0.5 + confidence / 2, values.size - 1) * std / np.sqrt(values.size)
+    return {'mean': mean, 'std': std, 'half_width': half_width,
+            'ci_low': mean - half_width, 'ci_high': mean + half_width}
+
+def run_replications(num_replications: int = 30,
+                     simulation_days: int = 365,
+                     units_per_market: int = 50,
+                     seed: int = None,
+                     workers: int = None,
+                     target_half_width: float = None,
+                     confidence: float = 0.95,
+                     batch_size: int = 10,
+                     dispatch_policy='specialist_first',
+                     backend: str = 'simpy',
+                     roster_path: str = None,
+                     claim_tables=None) -> Dict:
+    """
+    Run independent replications of the queuing simulation across a process pool.
+    
+    Replications run in batches. After each batch, the confidence interval of the
+    mean wait time is checked, and the run stops early once its half-width is at
+    or below target_half_width. Each replication gets its own child seed, and
+    batches do not depend on workers, so a given seed gives the same replications
+    whatever the worker count.
+    
+    :param num_replications: Maximum number of replications
+    :param simulation_days: Total days to simulate per replication
+    :param units_per_market: Number of units to install per market
+    :param seed: Optional master seed for reproducible runs
+    :param workers: Number of worker processes (default: all cores)
+    :param target_half_width: Stop once the wait-time CI half-width (days) is this small
+    :param confidence: Confidence level of the intervals
+    :param batch_size: Replications run between convergence checks
+    :param dispatch_policy: Name from DISPATCH_POLICIES
+    :param backend: 'simpy' or 'heap' (see run_simulation)
+    :param roster_path: GC roster CSV (claim_tables.load_gc_roster) instead of create_gc_roster()
+    :param claim_tables: Compiled risk tables for table-driven risk events (heap backend only)
+    :return: Dictionary with per-replication summaries, CI statistics and convergence flag
+    """
+    import pandas as pd
+    workers = workers or os.cpu_count() or 1
+    seed_seq = np.random.SeedSequence(seed)
+    summaries = []
+    converged = False
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    
+    try:
+        while len(summaries) < num_replications and not converged:
+            size = min(batch_size, num_replications - len(summaries))
+            seeds = [int(child.generate_state(1)[0]) for child in seed_seq.spawn(size)]
+            replications = range(len(summaries), len(summaries) + size)
+            args = (replications, seeds, [simulation_days] * size,
+                    [units_per_market] * size, [dispatch_policy] * size, [backend] * size,
+                    [roster_path] * size, [claim_tables] * size)
+            
+            if pool is None:
+                summaries.extend(map(_run_replication, *args))
+            else:
+                summaries.extend(instrumentation.pool_map(pool, _run_replication, *args))
+            
+            if target_half_width is not None:
+                wait_ci = confidence_interval([summary['avg_wait_time'] for summary in summaries], confidence)
+                converged = wait_ci['half_width'] <= target_half_width
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    replications_df = pd.DataFrame(summaries)
+    metrics = ['avg_wait_time', 'throughput_per_day', 'risk_event_rate', 'units_completed']
+    statistics = pd.DataFrame({metric: confidence_interval(replications_df[metric], confidence)
+                               for metric in metrics}).T
+    
+    return {
+        'replications': replications_df,
+        'statistics': statistics,
+        'num_replications': len(summaries),
+        'confidence': confidence,
+        'converged': converged
+    }
+
 if __name__ == "__main__":
     print("Running Installation Queue Simulation...")
     print("=" * 60)
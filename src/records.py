@@ -0,0 +1,108 @@
+#!/usr/bin/env python3.10
+"""
+Preallocated columnar recorders for simulation event logs.
+Stores events as typed NumPy columns (enums as small integer codes) instead of one dict per event.
+"""
+import numpy as np
+from enum import Enum
+from typing import Dict, TYPE_CHECKING
+from actors import MarketType, RiskType
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported where used: the numeric core does not need it
+
+class ColumnarRecorder:
+    """
+    Append-only table backed by one preallocated NumPy array per column.
+
+    Columns typed with an Enum class are stored as int8 codes and come back as
+    pandas categoricals (labelled with the enum values) from to_frame().
+    Capacity doubles when full, so appends are amortised O(1).
+    """
+
+    def __init__(self, schema: Dict[str, object], capacity: int = 1024):
+        """
+        :param schema: Column name -> NumPy dtype, or an Enum class for categorical columns
+        :param capacity: Initial number of rows to allocate
+        """
+        self.schema = schema
+        self._enums = {name: list(kind) for name, kind in schema.items()
+                       if isinstance(kind, type) and issubclass(kind, Enum)}
+        self._codes = {name: {member: code for code, member in enumerate(members)}
+                       for name, members in self._enums.items()}
+        self._columns = {name: np.empty(capacity, dtype=np.int8 if name in self._enums else kind)
+                         for name, kind in schema.items()}
+        self._size = 0
+
+    @classmethod
+    def from_columns(cls, schema: Dict[str, object], columns: Dict[str, np.ndarray]) -> 'ColumnarRecorder':
+        """Build a recorder from whole arrays (enum columns given as integer codes)."""
+        size = len(next(iter(columns.values()))) if columns else 0
+        recorder = cls(schema, capacity=max(size, 1))
+        for name, values in columns.items():
+            recorder._columns[name][:size] = values
+        recorder._size = size
+        return recorder
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self):
+        for name, values in self._columns.items():
+            grown = np.empty(2 * len(values), dtype=values.dtype)
+            grown[:self._size] = values[:self._size]
+            self._columns[name] = grown
+
+    def append(self, *values):
+        """Append one row; values are given in schema order (enum members for enum columns)."""
+        if self._size == len(next(iter(self._columns.values()))):
+            self._grow()
+        row = self._size
+        for (name, column), value in zip(self._columns.items(), values):
+            column[row] = self._codes[name][value] if name in self._codes else value
+        self._size += 1
+
+    def column(self, name: str) -> np.ndarray:
+        """View of a column's recorded values (enum columns as integer codes)."""
+        return self._columns[name][:self._size]
+
+    def to_frame(self) -> 'pd.DataFrame':
+        """
+        DataFrame view of the recorded rows. Numeric columns wrap the recorder's
+        arrays without copying; enum columns become categoricals of the enum values.
+        """
+        import pandas as pd
+        data = {}
+        for name in self.schema:
+            values = self.column(name)
+            if name in self._enums:
+                labels = [member.value for member in self._enums[name]]
+                data[name] = pd.Categorical.from_codes(values, categories=labels)
+            else:
+                data[name] = values
+        return pd.DataFrame(data, copy=False)
+
+    def __iter__(self):
+        """Iterate rows as dictionaries, with enum columns restored to enum members."""
+        columns = {name: self.column(name).tolist() for name in self.schema}
+        for row in range(self._size):
+            yield {name: (self._enums[name][values[row]] if name in self._enums else values[row])
+                   for name, values in columns.items()}
+
+# Record layouts used by the installation queue backends
+COMPLETED_UNIT_SCHEMA = {
+    'unit_id': np.int64,
+    'market': MarketType,
+    'completion_time': np.float64,
+    'wait_time': np.float64,
+    'gc_id': np.int32,
+    'had_risk_event': np.bool_
+}
+
+RISK_EVENT_SCHEMA = {
+    'time': np.float64,
+    'unit_id': np.int64,
+    'market': MarketType,
+    'risk_type': RiskType,
+    'gc_id': np.int32
+}
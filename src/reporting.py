@@ -0,0 +1,135 @@
+#!/usr/bin/env python3.10
+"""
+Figure rendering for the main.py pipeline.
+
+Stages reduce their results to small plot inputs (pre-binned histograms, per-year
+bands, arrays of sample paths) and a draw function turns those into a matplotlib
+figure. Figures render in parallel, and an image is redrawn only when the hash of
+its plot inputs and drawing code differs from the one recorded when it was written.
+"""
+import os
+import json
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+import instrumentation
+from stage_cache import CACHE_DIR, file_hash, source_hash
+
+# Input hash and image hash of every rendered figure, one JSON stamp per image
+FIGURE_CACHE_DIR = os.path.join(CACHE_DIR, 'figures')
+
+DPI = 150
+
+# (image path, draw function, plot inputs); draw(plt, plot_data) returns the figure
+FigureJob = Tuple[str, Callable, Dict]
+
+def pyplot():
+    """Import pyplot with the non-interactive backend (server use)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def _update_hash(digest, obj):
+    if isinstance(obj, dict):
+        digest.update(b'{')
+        for key in sorted(obj):
+            _update_hash(digest, str(key))
+            _update_hash(digest, obj[key])
+        digest.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'[')
+        for item in obj:
+            _update_hash(digest, item)
+        digest.update(b']')
+    elif isinstance(obj, np.ndarray) and obj.dtype != object:
+        digest.update(f"{obj.dtype.str}{obj.shape}".encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    else:
+        digest.update(repr(obj.tolist() if isinstance(obj, np.ndarray) else obj).encode())
+
+def data_hash(obj) -> str:
+    """SHA-256 of plot inputs: nested dicts, lists and tuples of arrays, numbers and strings."""
+    digest = hashlib.sha256()
+    _update_hash(digest, obj)
+    return digest.hexdigest()
+
+def histogram(values: np.ndarray, bins: int = 50, weights: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    Pre-binned histogram of values: 'counts' per bin and the bin 'edges'. Weights
+    count each value that many times (e.g. a quantile sketch's bucket counts).
+    """
+    counts, edges = np.histogram(np.asarray(values, dtype=float), bins=bins, weights=weights)
+    return {'counts': counts, 'edges': edges}
+
+def draw_histogram(ax, hist: Dict[str, np.ndarray], scale: float = 1.0, **style):
+    """Draw a pre-binned histogram; looks like ax.hist on the raw values divided by scale."""
+    edges = hist['edges'] / scale
+    return ax.hist(edges[:-1], bins=edges, weights=hist['counts'], **style)
+
+def draw_paths(ax, x: np.ndarray, paths: np.ndarray, scale: float = 1.0, **style):
+    """
+    Draw every row of a (paths, points) array as one LineCollection, colored like
+    successive ax.plot calls.
+    """
+    from matplotlib.collections import LineCollection
+    import matplotlib.pyplot as plt
+    x = np.asarray(x, dtype=float)
+    segments = np.stack(np.broadcast_arrays(x, paths / scale), axis=-1)
+    cycle = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    lines = LineCollection(segments, colors=[cycle[i % len(cycle)] for i in range(len(paths))], **style)
+    ax.add_collection(lines)
+    ax.autoscale_view()
+    return lines
+
+def _stamp_path(path: str) -> str:
+    return os.path.join(FIGURE_CACHE_DIR, os.path.basename(path) + '.json')
+
+def render_figure(path: str, draw: Callable, plot_data: Dict) -> bool:
+    """
+    Draw and save one figure, unless the image on disk was rendered from the same plot
+    inputs and drawing code.
+
+    :param path: Image path
+    :param draw: Function draw(plt, plot_data) returning the figure
+    :param plot_data: Plot inputs (see data_hash)
+    :return: True if the image was rendered, False if it was up to date
+    """
+    key = hashlib.sha256(f"{source_hash(draw)}{data_hash(plot_data)}{DPI}".encode()).hexdigest()
+    stamp = _stamp_path(path)
+    if os.path.exists(path) and os.path.exists(stamp):
+        with open(stamp) as f:
+            recorded = json.load(f)
+        if recorded['key'] == key and recorded['image'] == file_hash(path):
+            print(f"↺ {path.replace('../', '')}: plot inputs unchanged, keeping image")
+            return False
+
+    plt = pyplot()
+    with instrumentation.timer('render.draw'):
+        fig = draw(plt, plot_data)
+    with instrumentation.timer('render.savefig'):
+        # Layout is already tight (tight_layout), so skip bbox_inches='tight' and its extra draw
+        fig.savefig(path, dpi=DPI)
+    plt.close(fig)
+
+    os.makedirs(FIGURE_CACHE_DIR, exist_ok=True)
+    with open(stamp, 'w') as f:
+        json.dump({'key': key, 'image': file_hash(path)}, f)
+    print(f"✓ Saved: {path.replace('../', '')}")
+    return True
+
+def render_figures(jobs: List[FigureJob], workers: int = 1) -> List[bool]:
+    """
+    Render figures, in a process pool when workers > 1.
+
+    :param jobs: (path, draw, plot_data) tuples
+    :param workers: Number of worker processes
+    :return: For each job, whether its image was rendered
+    """
+    if workers is None or workers < 1:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        return [render_figure(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return instrumentation.pool_map(pool, render_figure, *zip(*jobs))
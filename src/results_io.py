@@ -0,0 +1,126 @@
+#!/usr/bin/env python3.10
+"""
+Pluggable writers and readers for simulation result tables.
+Supports typed, compressed columnar formats (Parquet, Feather, NumPy .npz) with CSV as an opt-in.
+"""
+import os
+import numpy as np
+import pandas as pd
+from typing import List
+import instrumentation
+
+# Format name -> file extension
+FORMATS = {
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'npz': '.npz',
+    'csv': '.csv'
+}
+
+# Default compression codec per format
+DEFAULT_COMPRESSION = {
+    'parquet': 'zstd',
+    'feather': 'lz4',
+    'npz': 'deflate',
+    'csv': None
+}
+
+def has_pyarrow() -> bool:
+    """Check whether pyarrow (needed for Parquet and Feather) is installed."""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def default_format() -> str:
+    """Parquet when pyarrow is available, otherwise NumPy .npz."""
+    return 'parquet' if has_pyarrow() else 'npz'
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast integer columns to the smallest type that holds them
+    (e.g. simulation -> int32, year -> int8). Float columns are left as float64.
+    """
+    columns = {}
+    for name, values in df.items():
+        if pd.api.types.is_integer_dtype(values) and len(values):
+            columns[name] = pd.to_numeric(values, downcast='integer')
+        else:
+            columns[name] = values
+    return pd.DataFrame(columns, index=df.index)
+
+def results_path(path_stem: str, fmt: str) -> str:
+    """Path for a result table, e.g. ('../data/monte_carlo_results', 'parquet')."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown results format '{fmt}'. Choose from {tuple(FORMATS)}")
+    return path_stem + FORMATS[fmt]
+
+def write_results(df: pd.DataFrame, path_stem: str, fmt: str = None, compression: str = None) -> str:
+    """
+    Write a result table in the chosen format.
+
+    :param df: Table to write
+    :param path_stem: Output path without extension
+    :param fmt: 'parquet', 'feather', 'npz' or 'csv' (default: default_format())
+    :param compression: Codec override ('uncompressed' to disable compression)
+    :return: Path of the file written
+    """
+    fmt = fmt or default_format()
+    path = results_path(path_stem, fmt)
+    compression = compression or DEFAULT_COMPRESSION[fmt]
+
+    if fmt in ('parquet', 'feather') and not has_pyarrow():
+        raise ImportError(f"Writing {fmt} files requires pyarrow (pip install pyarrow)")
+
+    with instrumentation.timer('io.write_results'):
+        if fmt == 'csv':
+            df.to_csv(path, index=False)
+        elif fmt == 'parquet':
+            compact_dtypes(df).to_parquet(path, index=False,
+                                          compression=None if compression == 'uncompressed' else compression)
+        elif fmt == 'feather':
+            compact_dtypes(df).reset_index(drop=True).to_feather(path, compression=compression)
+        else:
+            columns = {name: _to_numpy(values) for name, values in compact_dtypes(df).items()}
+            if compression == 'uncompressed':
+                np.savez(path, **columns)
+            else:
+                np.savez_compressed(path, **columns)
+
+    return path
+
+def _to_numpy(values: pd.Series) -> np.ndarray:
+    # Categoricals, enums and other Python objects are stored by their string value
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype(str).to_numpy(dtype=str)
+    if values.dtype == object:
+        return np.array([getattr(value, 'value', value) for value in values], dtype=str)
+    return values.to_numpy()
+
+def read_results(path: str, columns: List[str] = None, memory_map: bool = True) -> pd.DataFrame:
+    """
+    Read a result table written by write_results.
+
+    Only the requested columns are read (e.g. ['simulation', 'year', 'ending_capital']).
+    Parquet and Feather files are memory-mapped; uncompressed Feather is zero-copy.
+    NumPy .npz archives decompress one column at a time, on demand.
+
+    :param path: File to read (format taken from the extension)
+    :param columns: Columns to load (default: all)
+    :param memory_map: Memory-map the file where the format allows it
+    :return: DataFrame with the requested columns
+    """
+    extension = os.path.splitext(path)[1]
+    if extension == '.csv':
+        return pd.read_csv(path, usecols=columns)
+    if extension == '.parquet':
+        return pd.read_parquet(path, columns=columns, memory_map=memory_map)
+    if extension == '.feather':
+        import pyarrow.feather as feather
+        return feather.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+    if extension == '.npz':
+        with np.load(path) as archive:
+            names = columns if columns is not None else archive.files
+            return pd.DataFrame({name: archive[name] for name in names})
+    raise ValueError(f"Unrecognised results file extension '{extension}'")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3.10
+"""
+Tail-risk metrics for Monte Carlo results: Value at Risk, Tail Value at Risk and
+exceedance-probability curves for final capital and annual claims.
+
+RiskMetrics folds (simulations, years) path arrays in one pass. It keeps the exact
+values (sorted once when a metric is first asked for) or, for chunked and parallel
+runs, mergeable quantile sketches whose buckets give the same metrics within the
+sketch's relative accuracy.
+"""
+import numpy as np
+from typing import Dict, Sequence, Tuple, TYPE_CHECKING
+from aggregates import QuantileSketch, frame_to_paths
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported where used: the numeric core does not need it
+
+# Metric -> tail holding the adverse outcomes: low final capital, high annual claims
+METRICS = {'final_capital': 'lower', 'annual_claims': 'upper'}
+
+# Solvency II-style confidence level (a 1-in-200 outcome)
+DEFAULT_LEVEL = 0.995
+
+def observations(paths: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Values of each metric in a chunk of paths: one final capital per simulation and
+    one claims total per year the captive was trading (up to and including the
+    year it was ruined).
+    """
+    ending_capital = paths['ending_capital']
+    trading = np.ones(ending_capital.shape, dtype=bool)
+    trading[:, 1:] = ending_capital[:, :-1] > 0
+    return {
+        'final_capital': ending_capital[:, -1],
+        'annual_claims': paths['total_claims'][trading]
+    }
+
+def _upper_tail_mean(values: np.ndarray, weights: np.ndarray, mass: float) -> float:
+    """Weighted mean of the largest `mass` units of weight (values ascending)."""
+    values, weights = values[::-1], weights[::-1]
+    cumulative = np.cumsum(weights)
+    last = min(int(np.searchsorted(cumulative, mass)), len(values) - 1)
+    taken = weights[:last + 1].astype(float)
+    taken[-1] -= cumulative[last] - mass
+    return float(values[:last + 1] @ taken / mass)
+
+class RiskMetrics:
+    """
+    VaR, TVaR and exceedance curves over METRICS, built one chunk of paths at a time.
+
+    VaR at level 0.995 is the 1-in-200 outcome: the 99.5th percentile of annual
+    claims and the 0.5th percentile of final capital. TVaR is the mean outcome
+    beyond it (the worst 0.5% of annual claims or of final capitals).
+    """
+
+    def __init__(self, exact: bool = True, relative_accuracy: float = 0.005):
+        """
+        :param exact: Keep every value (exact quantiles) instead of quantile sketches
+        :param relative_accuracy: Relative accuracy of the sketches when not exact
+        """
+        self.exact = exact
+        if exact:
+            self.values = {metric: [] for metric in METRICS}
+        else:
+            self.sketches = {metric: QuantileSketch(relative_accuracy) for metric in METRICS}
+        self._sorted = {}
+
+    @classmethod
+    def from_frame(cls, results_df: 'pd.DataFrame') -> 'RiskMetrics':
+        """Exact metrics of a run_monte_carlo DataFrame."""
+        metrics = cls()
+        metrics.update(frame_to_paths(results_df))
+        return metrics
+
+    def update(self, paths: Dict[str, np.ndarray]):
+        """Fold a chunk of (simulations, years) path arrays into the metrics."""
+        for metric, values in observations(paths).items():
+            if self.exact:
+                self.values[metric].append(values)
+            else:
+                self.sketches[metric].update(values)
+        self._sorted.clear()
+
+    def merge(self, other: 'RiskMetrics'):
+        """Fold another RiskMetrics (of the same kind) into this one."""
+        if other.exact != self.exact:
+            raise ValueError("Cannot merge exact metrics with sketched metrics")
+        for metric in METRICS:
+            if self.exact:
+                self.values[metric].extend(other.values[metric])
+            else:
+                self.sketches[metric].merge(other.sketches[metric])
+        self._sorted.clear()
+
+    def distribution(self, metric: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distribution of a metric as ascending values and their weights (counts).
+
+        :return: Tuple of (values, weights) arrays
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Choose from {tuple(METRICS)}")
+        if metric not in self._sorted:
+            if self.exact:
+                values = np.sort(np.concatenate(self.values[metric])) if self.values[metric] else np.empty(0)
+                self._sorted[metric] = values, np.ones(values.size)
+            else:
+                self._sorted[metric] = self.sketches[metric].distribution()
+        return self._sorted[metric]
+
+    def quantile(self, metric: str, q: float) -> float:
+        """q-th quantile of a metric (linear interpolation when exact)."""
+        if not self.exact:
+            return self.sketches[metric].quantile(q)
+        values, _ = self.distribution(metric)
+        return float(np.quantile(values, q)) if values.size else np.nan
+
+    def var(self, metric: str, level: float = DEFAULT_LEVEL) -> float:
+        """Value at Risk: the metric's outcome exceeded (in its adverse tail) with probability 1 - level."""
+        return self.quantile(metric, level if METRICS[metric] == 'upper' else 1 - level)
+
+    def tvar(self, metric: str, level: float = DEFAULT_LEVEL) -> float:
+        """Tail Value at Risk: the mean of the metric's worst 1 - level share of outcomes."""
+        if not 0 < level < 1:
+            raise ValueError("level must be between 0 and 1")
+        values, weights = self.distribution(metric)
+        if values.size == 0:
+            return np.nan
+        mass = (1 - level) * weights.sum()
+        if METRICS[metric] == 'upper':
+            return _upper_tail_mean(values, weights, mass)
+        return -_upper_tail_mean(-values[::-1], weights[::-1], mass)
+
+    def exceedance_curve(self, metric: str, thresholds: Sequence[float] = None,
+                         points: int = 101) -> 'pd.DataFrame':
+        """
+        Probability of an outcome worse than each threshold: P(claims > x) for
+        annual claims, P(capital < x) for final capital.
+
+        :param thresholds: Thresholds to evaluate (default: evenly spaced over the observed range)
+        :param points: Number of default thresholds
+        :return: DataFrame with 'threshold' and 'exceedance_probability' columns
+        """
+        import pandas as pd
+        values, weights = self.distribution(metric)
+        if thresholds is None:
+            thresholds = np.linspace(values[0], values[-1], points) if values.size else np.empty(0)
+        thresholds = np.asarray(thresholds, dtype=float)
+        cumulative = np.concatenate([[0.0], np.cumsum(weights)])
+        total = cumulative[-1] if cumulative[-1] > 0 else 1.0
+        if METRICS[metric] == 'upper':
+            probability = 1 - cumulative[np.searchsorted(values, thresholds, side='right')] / total
+        else:
+            probability = cumulative[np.searchsorted(values, thresholds, side='left')] / total
+        return pd.DataFrame({'threshold': thresholds, 'exceedance_probability': probability})
+
+    def summary(self, level: float = DEFAULT_LEVEL) -> Dict[str, float]:
+        """VaR and TVaR of every metric, keyed like 'var_99.5_final_capital'."""
+        stats = {}
+        for metric in METRICS:
+            stats[f"var_{level * 100:g}_{metric}"] = self.var(metric, level)
+            stats[f"tvar_{level * 100:g}_{metric}"] = self.tvar(metric, level)
+        return stats
+
+if __name__ == "__main__":
+    import time
+    from risk_model import CaptiveInsuranceModel
+
+    model = CaptiveInsuranceModel(initial_capital=150_000, num_gcs=12, premium_per_gc_annual=5_000)
+    print("Tail-risk metrics (50,000 paths, 10 years)...")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    exact = RiskMetrics.from_frame(model.run_monte_carlo(num_simulations=50_000, years=10,
+                                                         engine='vectorized', seed=0, chunk_size=10_000))
+    print(f"Exact (full DataFrame):  {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    sketched = model.run_monte_carlo_streaming(num_simulations=50_000, years=10, seed=0,
+                                               chunk_size=10_000).risk_metrics
+    print(f"Sketched (streaming):    {time.perf_counter() - start:.2f}s\n")
+
+    print(f"{'':<32}{'exact':>14}{'sketch':>14}")
+    for key, value in exact.summary().items():
+        print(f"{key:<32}{value:>14,.0f}{sketched.summary()[key]:>14,.0f}")
+
+    curve = exact.exceedance_curve('annual_claims', thresholds=[0, 25_000, 50_000, 75_000, 100_000])
+    print("\nP(annual claims > x)")
+    for threshold, probability in curve.itertuples(index=False):
+        print(f"  ${threshold:>9,.0f}: {probability:.2%}")
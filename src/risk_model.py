@@ -3,17 +3,27 @@
 Monte Carlo simulation for actuarial risk modeling.
 Simulates thousands of years of operation to test solvency.
 """
+import os
 import numpy as np
-import pandas as pd
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, TYPE_CHECKING
 from datetime import datetime
 import random
+import instrumentation
+from actors import MarketType
+from aggregates import MonteCarloSummary, frame_to_paths, paths_to_frame
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported where used: the numeric core does not need it
 
 class CaptiveInsuranceModel:
     """
     Monte Carlo simulation for the Integral Mass Captive Insurance Company.
     """
     
+    # Available run_monte_carlo engines
+    ENGINES = ('scalar', 'vectorized')
+    
     def __init__(self, 
                  initial_capital: float = 1_000_000,
                  num_gcs: int = 12,
@@ -30,7 +40,7 @@ class CaptiveInsuranceModel:
         self.premium_per_gc_annual = premium_per_gc_annual
         self.annual_premium_income = num_gcs * premium_per_gc_annual
         
-        # Risk parameters (calibrated from queue simulation)
+        # Risk parameters (defaults; from_tables and from_queue calibrate claims from data)
         self.claim_probability = 0.15  # 15% chance of claim per GC per year
         self.claim_severity_mean = 25_000
         self.claim_severity_std = 10_000
@@ -38,6 +48,86 @@ class CaptiveInsuranceModel:
         # Investment return on reserves
         self.investment_return_rate = 0.04  # 4% annual return
         
+        # Optional table-driven claims (see from_tables): compiled ClaimTables and
+        # the market code of each GC
+        self.claim_tables = None
+        self.gc_markets = None
+        # Optional claims resampled from installation queue runs (see from_queue)
+        self.claim_surrogate = None
+        # Optional scenarios.EconomicScenarioGenerator: stochastic returns and correlated
+        # market claim shocks (vectorized engine)
+        self.scenario_generator = None
+    
+    @classmethod
+    def from_tables(cls,
+                    initial_capital: float = 1_000_000,
+                    premium_per_gc_annual: float = 50_000,
+                    risk_tables_path: str = None,
+                    roster_path: str = None) -> 'CaptiveInsuranceModel':
+        """
+        Model whose claims come from data/risk_tables.csv for the GCs in data/GC_roster.csv.
+        
+        Each GC's claim probability, risk type mix and severities are those of its
+        specialization's market. claim_probability and claim_severity_mean are set to
+        the roster averages for reporting; the claims themselves are drawn from the tables.
+        
+        :param risk_tables_path: Risk tables CSV (default: data/risk_tables.csv)
+        :param roster_path: GC roster CSV (default: data/GC_roster.csv)
+        """
+        from claim_tables import (RISK_TABLES_PATH, GC_ROSTER_PATH, load_claim_tables,
+                                  load_gc_roster, market_codes)
+        roster = load_gc_roster(roster_path or GC_ROSTER_PATH)
+        model = cls(initial_capital, len(roster), premium_per_gc_annual)
+        model.claim_tables = load_claim_tables(risk_tables_path or RISK_TABLES_PATH)
+        model.gc_markets = market_codes(roster)
+        
+        claim_probability = model.claim_tables.claim_probability[model.gc_markets]
+        model.claim_probability = float(claim_probability.mean())
+        model.claim_severity_mean = float(model.claim_tables.expected_claims(model.gc_markets).sum()
+                                          / claim_probability.sum())
+        return model
+    
+    @classmethod
+    def from_queue(cls,
+                   surrogate=None,
+                   initial_capital: float = 1_000_000,
+                   premium_per_gc_annual: float = 50_000,
+                   **fit_options) -> 'CaptiveInsuranceModel':
+        """
+        Model whose claims come from installation queue risk events.
+        
+        Claims are drawn from a QueueClaimSurrogate fitted to queue replications
+        (queue_coupling.fit_queue_surrogate), so each simulated year reflects the risk
+        events the roster's GCs actually incur in the queue, without rerunning it.
+        
+        :param surrogate: Fitted QueueClaimSurrogate (default: fitted with fit_options)
+        :param fit_options: fit_queue_surrogate arguments, when no surrogate is given
+        """
+        if surrogate is None:
+            from queue_coupling import fit_queue_surrogate
+            surrogate = fit_queue_surrogate(**fit_options)
+        model = cls(initial_capital, surrogate.num_gcs, premium_per_gc_annual)
+        model.claim_surrogate = surrogate
+        
+        # Roster averages, for reporting: share of GC-years with a claim and their mean claims,
+        # so num_gcs * claim_probability * claim_severity_mean is still the expected annual claims
+        model.claim_probability = float((surrogate.annual_counts > 0).mean())
+        if model.claim_probability == 0:
+            # No risk events in the fitted queue years (short horizon, low-risk roster)
+            model.claim_severity_mean = 0.0
+        else:
+            model.claim_severity_mean = surrogate.expected_annual_claims / (model.num_gcs * model.claim_probability)
+        return model
+    
+    @property
+    def expected_annual_claims(self) -> float:
+        """Expected claims per year across all GCs."""
+        if self.claim_surrogate is not None:
+            return self.claim_surrogate.expected_annual_claims
+        if self.claim_tables is not None:
+            return float(self.claim_tables.expected_claims(self.gc_markets).sum())
+        return self.num_gcs * self.claim_probability * self.claim_severity_mean
+    
     def simulate_year(self, current_capital: float) -> Dict:
         """
         Simulate one year of operations.
@@ -55,15 +145,23 @@ class CaptiveInsuranceModel:
         total_claims = 0
         num_claims = 0
         
-        for _ in range(self.num_gcs):
-            if random.random() < self.claim_probability:
-                # Claim occurred - sample severity from lognormal distribution
-                claim_amount = max(0, np.random.normal(
-                    self.claim_severity_mean, 
-                    self.claim_severity_std
-                ))
-                total_claims += claim_amount
-                num_claims += 1
+        if self.claim_surrogate is not None:
+            total_claims, num_claims = self.claim_surrogate.draw_year()
+        elif self.claim_tables is not None:
+            for market in self.gc_markets.tolist():
+                if random.random() < self.claim_tables.claim_probability[market]:
+                    total_claims += self.claim_tables.draw_claim(market)
+                    num_claims += 1
+        else:
+            for _ in range(self.num_gcs):
+                if random.random() < self.claim_probability:
+                    # Claim occurred - sample severity from lognormal distribution
+                    claim_amount = max(0, np.random.normal(
+                        self.claim_severity_mean, 
+                        self.claim_severity_std
+                    ))
+                    total_claims += claim_amount
+                    num_claims += 1
         
         # Operating expenses (10% of premium)
         operating_expenses = premium_income * 0.10
@@ -73,7 +171,7 @@ class CaptiveInsuranceModel:
         ending_capital = current_capital + net_income
         
         # Calculate solvency ratio (capital / expected annual claims)
-        expected_annual_claims = self.num_gcs * self.claim_probability * self.claim_severity_mean
+        expected_annual_claims = self.expected_annual_claims
         solvency_ratio = ending_capital / expected_annual_claims if expected_annual_claims > 0 else 0
         
         return {
@@ -88,113 +186,511 @@ class CaptiveInsuranceModel:
             'is_solvent': ending_capital > 0
         }
     
-    def run_monte_carlo(self, num_simulations: int = 10_000, years: int = 10) -> pd.DataFrame:
+    def _ruined_year(self, capital: float) -> Dict:
+        """Year result for a captive that is already insolvent (no further activity)."""
+        expected_annual_claims = self.expected_annual_claims
+        return {
+            'premium_income': 0,
+            'investment_income': 0.0,
+            'total_claims': 0,
+            'num_claims': 0,
+            'operating_expenses': 0.0,
+            'net_income': 0.0,
+            'ending_capital': capital,
+            'solvency_ratio': capital / expected_annual_claims if expected_annual_claims > 0 else 0,
+            'is_solvent': False
+        }
+    
+    def run_monte_carlo(self,
+                        num_simulations: int = 10_000,
+                        years: int = 10,
+                        engine: str = 'scalar',
+                        seed: int = None,
+                        workers: int = 1,
+                        chunk_size: int = 50_000) -> 'pd.DataFrame':
         """
         Run Monte Carlo simulation across multiple scenarios.
         
         :param num_simulations: Number of simulation runs
         :param years: Number of years to simulate per run
+        :param engine: 'scalar' (one GC at a time) or 'vectorized' (NumPy arrays)
+        :param seed: Optional seed for reproducible runs
+        :param workers: Number of worker processes (vectorized engine only)
+        :param chunk_size: Simulations per chunk/child seed (vectorized engine only)
         :return: DataFrame with simulation results
         """
+        import pandas as pd
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'. Choose from {self.ENGINES}")
+        
+        if engine == 'vectorized':
+            chunks = plan_chunks(num_simulations, chunk_size, seed)
+            tasks = [(self, size, years, seed_seq) for _, size, seed_seq in chunks]
+            chunk_paths = map_chunks(_simulate_chunk, tasks, workers)
+            with instrumentation.timer('mc.build_frame'):
+                frames = [paths_to_frame(paths, first_simulation)
+                          for (first_simulation, _, _), paths in zip(chunks, chunk_paths)]
+                return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        
+        if workers != 1:
+            raise ValueError("The scalar engine uses global random state and runs on one core; "
+                             "use engine='vectorized' for workers > 1")
+        if self.scenario_generator is not None:
+            raise ValueError("Economic scenarios need engine='vectorized'")
+        
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+        
         results = []
+        instrumentation.count('mc.paths', num_simulations)
+        with instrumentation.timer('mc.simulate_paths'):
+            for sim in range(num_simulations):
+                capital = self.initial_capital
+                sim_solvent = True
+                
+                for year in range(years):
+                    if sim_solvent:
+                        year_result = self.simulate_year(capital)
+                        capital = year_result['ending_capital']
+                    else:
+                        # Ruin is absorbing: a ruined captive stops trading
+                        year_result = self._ruined_year(capital)
+                    
+                    if capital <= 0:
+                        sim_solvent = False
+                    
+                    results.append({
+                        'simulation': sim,
+                        'year': year,
+                        **year_result
+                    })
+                
+                # Record final outcome
+                if sim % 1000 == 0:
+                    print(f"Completed simulation {sim}/{num_simulations}")
         
-        for sim in range(num_simulations):
-            capital = self.initial_capital
-            sim_solvent = True
-            
-            for year in range(years):
-                year_result = self.simulate_year(capital)
-                capital = year_result['ending_capital']
+        with instrumentation.timer('mc.build_frame'):
+            return pd.DataFrame(results)
+    
+    def run_monte_carlo_streaming(self,
+                                  num_simulations: int = 10_000,
+                                  years: int = 10,
+                                  chunk_size: int = 50_000,
+                                  sample_paths: int = 20,
+                                  seed: int = None,
+                                  workers: int = 1) -> MonteCarloSummary:
+        """
+        Run the vectorized Monte Carlo in fixed-size chunks, keeping only running aggregates.
+        
+        Memory is bounded by chunk_size rather than num_simulations. Each chunk draws
+        from its own child seed and chunk summaries are merged in chunk order, so
+        results depend only on seed and chunk_size, never on the number of workers.
+        
+        :param num_simulations: Number of simulation runs
+        :param years: Number of years to simulate per run
+        :param chunk_size: Number of simulations held in memory at once (per worker)
+        :param sample_paths: Number of full paths to keep for trajectory plots
+        :param seed: Optional seed for reproducible runs
+        :param workers: Number of worker processes
+        :return: MonteCarloSummary with ruin counts, solvency and final capital statistics
+        """
+        summary = MonteCarloSummary(years, sample_paths=sample_paths)
+        
+        tasks = [(self, first_simulation, size, years, seed_seq, sample_paths)
+                 for first_simulation, size, seed_seq in plan_chunks(num_simulations, chunk_size, seed)]
+        for chunk_summary in map_chunks(_summarize_chunk, tasks, workers):
+            summary.merge(chunk_summary)
+        
+        return summary
+    
+    def _draw_claims(self, num_simulations: int, years: int, rng: np.random.Generator,
+                     frequency_multiplier: np.ndarray = None):
+        """
+        Draw claim counts and totals for a (simulations x years x GCs) block at once.
+        
+        Same distribution as simulate_year: each GC has a claim with probability
+        claim_probability, and the severity is a normal draw floored at zero
+        (or, for table-driven and queue-coupled models, as drawn by
+        ClaimTables.draw_claims and QueueClaimSurrogate.draw_claims).
+        
+        :param frequency_multiplier: Optional (simulations, years, markets) scenario shocks
+                                     scaling each GC's claim probability by its market's
+        :return: Tuple of (total_claims, num_claims) arrays shaped (simulations, years)
+        """
+        shape = (num_simulations, years, self.num_gcs)
+        with instrumentation.timer('mc.draw_claims'):
+            if self.claim_surrogate is not None:
+                if frequency_multiplier is not None:
+                    raise ValueError("Economic scenarios cannot shock queue-coupled claims")
+                return self.claim_surrogate.draw_claims(num_simulations, years, rng)
+            if self.claim_tables is not None:
+                return self.claim_tables.draw_claims(self.gc_markets, num_simulations, years, rng,
+                                                     frequency_multiplier)
+            claim_probability = self.claim_probability
+            if frequency_multiplier is not None:
+                shock = frequency_multiplier[..., self._gc_markets()]
+                claim_probability = np.minimum(claim_probability * shock, 1)
+            has_claim = rng.random(shape) < claim_probability
+            severity = rng.normal(self.claim_severity_mean, self.claim_severity_std, shape)
+            np.maximum(severity, 0, out=severity)
+            severity *= has_claim
+            return severity.sum(axis=2), has_claim.sum(axis=2)
+    
+    def _gc_markets(self) -> np.ndarray:
+        """Market code of each GC: the roster's, or blocks of GCs per market like create_gc_roster."""
+        if self.gc_markets is not None:
+            return self.gc_markets
+        return np.arange(self.num_gcs) * len(MarketType) // self.num_gcs
+    
+    def _draw_scenario(self, num_simulations: int, years: int, rng: np.random.Generator):
+        """Scenario arrays for a block of paths, or None without a scenario generator."""
+        if self.scenario_generator is None:
+            return None
+        with instrumentation.timer('mc.draw_scenarios'):
+            return self.scenario_generator.generate(num_simulations, years, rng,
+                                                    base_return=self.investment_return_rate)
+    
+    def _simulate_paths(self, num_simulations: int, years: int,
+                        rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """
+        Vectorized equivalent of running simulate_year for every simulation and year.
+        
+        Ruin is absorbing: once a path's capital reaches zero it stops trading, its
+        capital is frozen and it is dropped from the arrays drawn in later years.
+        The loop ends early once every path is ruined. With a scenario generator, the
+        whole block's returns and claim shocks are drawn up front.
+        
+        :return: Dictionary of (simulations, years) arrays keyed like simulate_year
+        """
+        shape = (num_simulations, years)
+        premium_income = np.zeros(shape)
+        investment_income = np.zeros(shape)
+        total_claims = np.zeros(shape)
+        num_claims = np.zeros(shape, dtype=np.int64)
+        operating_expenses = np.zeros(shape)
+        ending_capital = np.empty(shape)
+        
+        annual_premium = float(self.annual_premium_income)
+        annual_expenses = annual_premium * 0.10
+        
+        capital = np.full(num_simulations, float(self.initial_capital))
+        active = np.arange(num_simulations)
+        scenario = self._draw_scenario(num_simulations, years, rng)
+        
+        for year in range(years):
+            if active.size:
+                # Plain slices are much cheaper than fancy indexing while nobody is ruined
+                rows = slice(None) if active.size == num_simulations else active
+                if scenario is None:
+                    claims, counts = self._draw_claims(active.size, 1, rng)
+                    interest = capital[rows] * self.investment_return_rate
+                else:
+                    claims, counts = self._draw_claims(active.size, 1, rng,
+                                                       scenario['frequency_multiplier'][rows, year:year + 1])
+                    interest = capital[rows] * scenario['investment_return'][rows, year]
                 
-                if capital <= 0:
-                    sim_solvent = False
+                premium_income[rows, year] = annual_premium
+                investment_income[rows, year] = interest
+                total_claims[rows, year] = claims[:, 0]
+                num_claims[rows, year] = counts[:, 0]
+                operating_expenses[rows, year] = annual_expenses
                 
-                results.append({
-                    'simulation': sim,
-                    'year': year,
-                    **year_result
-                })
+                capital[rows] += annual_premium + interest - claims[:, 0] - annual_expenses
+                active = active[capital[rows] > 0]
             
-            # Record final outcome
-            if sim % 1000 == 0:
-                print(f"Completed simulation {sim}/{num_simulations}")
+            ending_capital[:, year] = capital
+        
+        expected_annual_claims = self.expected_annual_claims
+        if expected_annual_claims > 0:
+            solvency_ratio = ending_capital / expected_annual_claims
+        else:
+            solvency_ratio = np.zeros_like(ending_capital)
         
-        return pd.DataFrame(results)
+        return {
+            'premium_income': premium_income,
+            'investment_income': investment_income,
+            'total_claims': total_claims,
+            'num_claims': num_claims,
+            'operating_expenses': operating_expenses,
+            'net_income': premium_income + investment_income - total_claims - operating_expenses,
+            'ending_capital': ending_capital,
+            'solvency_ratio': solvency_ratio,
+            'is_solvent': ending_capital > 0
+        }
     
-    def calculate_ruin_probability(self, results_df: pd.DataFrame) -> float:
+    def calculate_ruin_probability(self, results_df) -> float:
         """
         Calculate the probability of ruin (insolvency) from simulation results.
         
-        :param results_df: DataFrame from run_monte_carlo
+        :param results_df: DataFrame from run_monte_carlo, or MonteCarloSummary
+                           from run_monte_carlo_streaming
         :return: Probability of ruin
         """
-        # Get final year for each simulation
-        final_years = results_df.groupby('simulation').last()
+        if isinstance(results_df, MonteCarloSummary):
+            return results_df.ruin_probability
         
-        # Count how many ended insolvent
-        insolvent_count = (final_years['ending_capital'] <= 0).sum()
-        total_sims = len(final_years)
+        # A simulation is ruined if capital hit zero in any year, not just the last
+        insolvent_count = results_df.loc[results_df['ending_capital'] <= 0, 'simulation'].nunique()
+        total_sims = results_df['simulation'].nunique()
         
         return insolvent_count / total_sims
     
     def calculate_required_capital(self, 
                                    target_ruin_prob: float = 0.01,
                                    years: int = 10,
-                                   num_simulations: int = 1000) -> float:
+                                   num_simulations: int = 1000,
+                                   seed: int = None,
+                                   workers: int = 1) -> float:
         """
         Calculate the required initial capital to achieve target ruin probability.
         
+        Uses common random numbers: claim streams are simulated once and the ruin
+        threshold of every path is solved exactly, instead of re-simulating for
+        each candidate capital.
+        
         :param target_ruin_prob: Target probability of ruin (e.g., 0.01 = 1%)
         :param years: Planning horizon
-        :param num_simulations: Number of simulations per test
+        :param num_simulations: Number of simulated claim streams
+        :param seed: Optional seed for reproducible runs
+        :param workers: Number of worker processes
         :return: Required initial capital
         """
-        # Binary search for required capital
-        low_capital = 100_000
-        high_capital = 5_000_000
-        tolerance = 0.005  # 0.5% tolerance on ruin probability
+        thresholds = np.sort(self.simulate_ruin_thresholds(num_simulations, years, seed, workers))
         
-        while high_capital - low_capital > 10_000:
-            test_capital = (low_capital + high_capital) / 2
-            
-            # Test this capital level
-            self.initial_capital = test_capital
-            results = self.run_monte_carlo(num_simulations, years)
-            ruin_prob = self.calculate_ruin_probability(results)
-            
-            print(f"Testing capital ${test_capital:,.0f}: Ruin prob = {ruin_prob:.4f}")
-            
-            if ruin_prob > target_ruin_prob + tolerance:
-                # Need more capital
-                low_capital = test_capital
-            elif ruin_prob < target_ruin_prob - tolerance:
-                # Can use less capital
-                high_capital = test_capital
-            else:
-                # Within tolerance
-                return test_capital
-        
-        return high_capital
+        # Ruin happens when initial capital <= threshold; allow at most this many ruined paths
+        allowed_ruins = int(np.floor(target_ruin_prob * len(thresholds)))
+        if allowed_ruins >= len(thresholds):
+            return 0.0
+        
+        binding_threshold = thresholds[len(thresholds) - allowed_ruins - 1]
+        return max(0.0, float(np.nextafter(binding_threshold, np.inf)))
+    
+    def capital_ruin_curve(self,
+                           capitals=None,
+                           years: int = 10,
+                           num_simulations: int = 10_000,
+                           seed: int = None,
+                           workers: int = 1) -> 'pd.DataFrame':
+        """
+        Ruin probability as a function of initial capital, from one set of claim draws.
+        
+        :param capitals: Initial capital levels to evaluate (default: $100K to $5M)
+        :param years: Planning horizon
+        :param num_simulations: Number of simulated claim streams
+        :param seed: Optional seed for reproducible runs
+        :param workers: Number of worker processes
+        :return: DataFrame with 'initial_capital' and 'ruin_probability' columns
+        """
+        import pandas as pd
+        if capitals is None:
+            capitals = np.linspace(100_000, 5_000_000, 99)
+        capitals = np.asarray(capitals, dtype=float)
+        
+        thresholds = np.sort(self.simulate_ruin_thresholds(num_simulations, years, seed, workers))
+        ruined = len(thresholds) - np.searchsorted(thresholds, capitals, side='left')
+        
+        return pd.DataFrame({
+            'initial_capital': capitals,
+            'ruin_probability': ruined / len(thresholds)
+        })
+    
+    def estimate_ruin_probability(self,
+                                  num_simulations: int = 10_000,
+                                  years: int = 10,
+                                  method: str = 'plain',
+                                  seed: int = None,
+                                  **options) -> Dict:
+        """
+        Estimate the probability of ruin with a variance-reduction method.
+        
+        :param num_simulations: Number of paths
+        :param years: Planning horizon
+        :param method: 'plain', 'antithetic', 'control_variate', 'stratified', 'sobol'
+                       or 'importance' (see variance_reduction.METHODS)
+        :param seed: Optional seed for reproducible runs
+        :param options: Method settings passed to variance_reduction.estimate_ruin_probability
+        :return: Dictionary with the estimate, its standard error and a 95% confidence interval
+        """
+        from variance_reduction import estimate_ruin_probability
+        return estimate_ruin_probability(self, num_simulations, years, method, seed, **options)
+    
+    def sweep(self,
+              grid: Dict[str, List],
+              num_simulations: int = 10_000,
+              years: int = 10,
+              seed: int = None,
+              workers: int = 1,
+              **options):
+        """
+        Evaluate a grid of num_gcs, premium_per_gc_annual, investment_return_rate and
+        initial_capital values against one shared set of claim draws.
+        
+        :param grid: Parameter name -> values (parameters left out keep this model's value)
+        :param num_simulations: Claim streams shared by every grid point
+        :param years: Planning horizon
+        :param seed: Optional seed for reproducible runs
+        :param workers: Number of worker processes
+        :param options: Settings passed to sweep.sweep (quantiles, chunk_size)
+        :return: sweep.SweepResult of metric arrays shaped like the grid
+        """
+        from sweep import sweep
+        return sweep(self, grid, num_simulations, years, seed, workers, **options)
+    
+    def simulate_ruin_thresholds(self,
+                                 num_simulations: int = 10_000,
+                                 years: int = 10,
+                                 seed: int = None,
+                                 workers: int = 1,
+                                 chunk_size: int = 50_000) -> np.ndarray:
+        """
+        Simulate claim streams and return, for each path, the initial capital at or
+        below which that path is ruined in some year.
+        
+        Capital is affine in initial capital, C[t] = g^t * C0 + D[t], so a path is
+        ruined exactly when C0 <= max_t(-D[t] / g^t) whatever capital is chosen.
+        
+        :return: Array of per-path ruin thresholds
+        """
+        tasks = [(self, size, years, seed_seq)
+                 for _, size, seed_seq in plan_chunks(num_simulations, chunk_size, seed)]
+        return np.concatenate(map_chunks(_threshold_chunk, tasks, workers))
+    
+    def _ruin_thresholds(self, num_simulations: int, years: int,
+                         rng: np.random.Generator) -> np.ndarray:
+        scenario = self._draw_scenario(num_simulations, years, rng)
+        if scenario is None:
+            total_claims, _ = self._draw_claims(num_simulations, years, rng)
+            return self._thresholds_from_claims(total_claims)
+        total_claims, _ = self._draw_claims(num_simulations, years, rng, scenario['frequency_multiplier'])
+        return self._thresholds_from_claims(total_claims, scenario['investment_return'])
+    
+    def _thresholds_from_claims(self, total_claims: np.ndarray,
+                                investment_returns: np.ndarray = None) -> np.ndarray:
+        """
+        Ruin threshold of each path from its (simulations, years) claim totals, and
+        optionally its (simulations, years) investment returns.
+        """
+        premium_income = float(self.annual_premium_income)
+        cash_flow = premium_income * 0.90 - total_claims
+        
+        # Worst running present value (at the investment rate) of net cash flows
+        if investment_returns is None:
+            growth = (1 + self.investment_return_rate) ** np.arange(1, total_claims.shape[1] + 1)
+        else:
+            growth = np.cumprod(1 + investment_returns, axis=1)
+        return (-np.cumsum(cash_flow / growth, axis=1)).max(axis=1)
+    
+def plan_chunks(num_simulations: int, chunk_size: int, seed: int = None) -> List:
+    """
+    Split a run into chunks, each with its own independent child seed.
+    
+    :return: List of (first_simulation, size, SeedSequence) tuples
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    starts = list(range(0, num_simulations, chunk_size))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    return [(start, min(chunk_size, num_simulations - start), seed_seq)
+            for start, seed_seq in zip(starts, seeds)]
+
+def map_chunks(func, tasks: List[tuple], workers: int = 1) -> List:
+    """
+    Apply func to every task tuple, in a process pool when workers > 1.
+    Results are returned in task order whatever the number of workers.
+    """
+    if workers is None or workers < 1:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        return [func(*task) for task in tasks]
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return instrumentation.pool_map(pool, func, *zip(*tasks))
+
+def _simulate_chunk(model: CaptiveInsuranceModel, size: int, years: int,
+                    seed_seq: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    """Worker: simulate one chunk of paths from its own child seed."""
+    instrumentation.count('mc.paths', size)
+    with instrumentation.timer('mc.simulate_paths'):
+        return model._simulate_paths(size, years, np.random.default_rng(seed_seq))
+
+def _summarize_chunk(model: CaptiveInsuranceModel, first_simulation: int, size: int, years: int,
+                     seed_seq: np.random.SeedSequence, sample_paths: int) -> MonteCarloSummary:
+    """Worker: simulate one chunk of paths and reduce it to a MonteCarloSummary."""
+    summary = MonteCarloSummary(years, sample_paths=sample_paths)
+    summary.update(_simulate_chunk(model, size, years, seed_seq), first_simulation)
+    return summary
+
+def _threshold_chunk(model: CaptiveInsuranceModel, size: int, years: int,
+                     seed_seq: np.random.SeedSequence) -> np.ndarray:
+    """Worker: simulate one chunk of claim streams and return their ruin thresholds."""
+    instrumentation.count('mc.claim_streams', size)
+    with instrumentation.timer('mc.ruin_thresholds'):
+        return model._ruin_thresholds(size, years, np.random.default_rng(seed_seq))
+
+def calculate_time_to_ruin(results_df) -> 'pd.Series':
+    """
+    Probability of first ruin in each year (first-passage distribution).
+    
+    :param results_df: DataFrame from run_monte_carlo, or MonteCarloSummary
+                       from run_monte_carlo_streaming
+    :return: Series indexed by year; sums to the probability of ruin
+    """
+    import pandas as pd
+    if isinstance(results_df, MonteCarloSummary):
+        return results_df.time_to_ruin()
+    
+    years = int(results_df['year'].max()) + 1
+    total_sims = results_df['simulation'].nunique()
+    first_ruin = results_df.loc[results_df['ending_capital'] <= 0].groupby('simulation')['year'].min()
+    counts = np.bincount(first_ruin.to_numpy(dtype=np.int64), minlength=years)
+    return pd.Series(counts / total_sims, index=pd.Index(np.arange(years), name='year'),
+                     name='ruin_probability')
 
-def generate_summary_statistics(results_df: pd.DataFrame) -> Dict:
+def generate_summary_statistics(results_df) -> Dict:
     """
-    Generate summary statistics from Monte Carlo results.
+    Generate summary statistics from Monte Carlo results, including the 99.5% VaR and
+    TVaR of final capital and annual claims (see risk_metrics).
     
-    :param results_df: DataFrame from run_monte_carlo
+    :param results_df: DataFrame from run_monte_carlo, its (simulations, years) path
+                       arrays from aggregates.frame_to_paths, or MonteCarloSummary
+                       from run_monte_carlo_streaming
     :return: Dictionary of summary statistics
     """
-    final_years = results_df.groupby('simulation').last()
+    from risk_metrics import RiskMetrics
+    if isinstance(results_df, MonteCarloSummary):
+        sketch = results_df.final_capital_sketch
+        return {
+            'mean_final_capital': results_df.final_capital_mean,
+            'median_final_capital': sketch.quantile(0.5),
+            'std_final_capital': results_df.final_capital_std(),
+            'min_final_capital': sketch.min,
+            'max_final_capital': sketch.max,
+            'probability_of_ruin': results_df.ruin_probability,
+            'mean_solvency_ratio': results_df.solvency_mean[-1],
+            'percentile_5_capital': sketch.quantile(0.05),
+            'percentile_95_capital': sketch.quantile(0.95),
+            **results_df.risk_metrics.summary()
+        }
+    
+    # One reshape into path arrays instead of a groupby per statistic
+    paths = results_df if isinstance(results_df, dict) else frame_to_paths(results_df)
+    final_capital = paths['ending_capital'][:, -1]
+    ever_ruined = (paths['ending_capital'] <= 0).any(axis=1)
+    metrics = RiskMetrics()
+    metrics.update(paths)
     
     stats = {
-        'mean_final_capital': final_years['ending_capital'].mean(),
-        'median_final_capital': final_years['ending_capital'].median(),
-        'std_final_capital': final_years['ending_capital'].std(),
-        'min_final_capital': final_years['ending_capital'].min(),
-        'max_final_capital': final_years['ending_capital'].max(),
-        'probability_of_ruin': (final_years['ending_capital'] <= 0).mean(),
-        'mean_solvency_ratio': final_years['solvency_ratio'].mean(),
-        'percentile_5_capital': final_years['ending_capital'].quantile(0.05),
-        'percentile_95_capital': final_years['ending_capital'].quantile(0.95)
+        'mean_final_capital': final_capital.mean(),
+        'median_final_capital': np.median(final_capital),
+        'std_final_capital': final_capital.std(ddof=1),
+        'min_final_capital': final_capital.min(),
+        'max_final_capital': final_capital.max(),
+        'probability_of_ruin': ever_ruined.mean(),
+        'mean_solvency_ratio': paths['solvency_ratio'][:, -1].mean(),
+        'percentile_5_capital': metrics.quantile('final_capital', 0.05),
+        'percentile_95_capital': metrics.quantile('final_capital', 0.95),
+        **metrics.summary()
     }
     
     return stats
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3.10
+"""
+Content-addressed cache for the main.py pipeline stages.
+A stage is rerun only when its parameters, seed or source code change, or when one of
+its output files has gone missing or been modified; otherwise its previous artifacts are reused.
+"""
+import os
+import json
+import pickle
+import hashlib
+import inspect
+from datetime import datetime
+from typing import Callable, Dict, List
+
+CACHE_DIR = '../data/.cache'
+MANIFEST_PATH = '../data/manifest.json'
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_hash(*objects) -> str:
+    """
+    Hash the source code of functions, classes or modules, or the contents of source files.
+
+    :param objects: Anything inspect.getsource accepts, or paths of source files
+                    (so modules can be hashed without being imported)
+    :return: SHA-256 of the concatenated sources
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        if isinstance(obj, str):
+            with open(obj, 'rb') as f:
+                digest.update(f.read())
+        else:
+            digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()
+
+def stage_key(name: str, params: Dict, sources: str) -> str:
+    """
+    Cache key for one stage run.
+
+    :param name: Stage name
+    :param params: JSON-serialisable stage parameters, including the seed
+    :param sources: source_hash() of the code the stage depends on
+    :return: Hex digest identifying the stage inputs
+    """
+    payload = json.dumps({'stage': name, 'params': params, 'sources': sources},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class StageCache:
+    """
+    Pickled stage results plus a JSON manifest of each stage's key and artifacts.
+
+    The manifest records, for every stage, the key it was last built with, the
+    SHA-256 of each artifact it wrote and whether the latest run rebuilt it.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, manifest_path: str = MANIFEST_PATH,
+                 force: List[str] = None):
+        """
+        :param cache_dir: Directory for pickled stage results
+        :param manifest_path: JSON manifest file
+        :param force: Stage names to rebuild regardless of the cache ('all' rebuilds every stage)
+        """
+        self.cache_dir = cache_dir
+        self.manifest_path = manifest_path
+        self.force = set(force or [])
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.manifest = {'stages': {}}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def _result_path(self, name: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}-{key[:16]}.pkl")
+
+    def is_fresh(self, name: str, key: str) -> bool:
+        """True if the stage was last built with this key and its artifacts are unchanged on disk."""
+        if 'all' in self.force or name in self.force:
+            return False
+        entry = self.manifest['stages'].get(name)
+        if entry is None or entry['key'] != key or not os.path.exists(self._result_path(name, key)):
+            return False
+        return all(os.path.exists(path) and file_hash(path) == digest
+                   for path, digest in entry['artifacts'].items())
+
+    def load(self, name: str, key: str):
+        """Return the stored result of a stage."""
+        with open(self._result_path(name, key), 'rb') as f:
+            return pickle.load(f)
+
+    def reuse(self, name: str, key: str):
+        """Load a fresh stage's stored result and mark it as not rebuilt in the manifest."""
+        print(f"\n↺ {name}: inputs unchanged, reusing previous outputs")
+        self.manifest['stages'][name]['rebuilt'] = False
+        return self.load(name, key)
+
+    def store(self, name: str, key: str, params: Dict, result, artifacts: List[str]):
+        """
+        Save a stage result and record its artifacts in the manifest.
+
+        :param artifacts: Paths of the files the stage wrote
+        """
+        previous = self.manifest['stages'].get(name)
+        if previous is not None and previous['key'] != key:
+            stale = self._result_path(name, previous['key'])
+            if os.path.exists(stale):
+                os.remove(stale)
+
+        with open(self._result_path(name, key), 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.manifest['stages'][name] = {
+            'key': key,
+            'params': params,
+            'artifacts': {path: file_hash(path) for path in artifacts},
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+            'rebuilt': True
+        }
+
+    def run(self, name: str, func: Callable, params: Dict, artifacts: List[str], sources: str):
+        """
+        Run a stage, or reuse its previous result if its inputs are unchanged.
+
+        :param name: Stage name (manifest entry)
+        :param func: Stage function, called as func(**params)
+        :param params: Stage parameters, including the seed
+        :param artifacts: Files the stage writes
+        :param sources: source_hash() of the code the stage depends on
+        :return: The stage result
+        """
+        key = stage_key(name, params, sources)
+        if self.is_fresh(name, key):
+            return self.reuse(name, key)
+
+        result = func(**params)
+        self.store(name, key, params, result, artifacts)
+        return result
+
+    def save_manifest(self):
+        """Write the manifest (stages rebuilt by this run have 'rebuilt': true)."""
+        self.manifest['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        with open(self.manifest_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+            f.write('\n')
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3.10
+"""
+Parameter sweeps over CaptiveInsuranceModel with common random numbers.
+
+Every grid point is evaluated against one shared set of claim draws. Capital is affine
+in the initial capital and the premium once claims and the investment rate are fixed:
+
+    C[t] = g^t * (C0 - S[t]),   S[t] = sum_{s<=t} (X[s] - 0.9 * P) / g^s,   g = 1 + r
+
+so a single pass over the discounted claims gives ruin, final capital and solvency for
+every (premium, initial capital) pair. Roster sizes share draws too: claims are drawn
+per GC for the largest roster and smaller rosters use the first num_gcs GCs.
+"""
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Tuple, TYPE_CHECKING
+import instrumentation
+from risk_model import plan_chunks
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported where used: the numeric core does not need it
+    from risk_model import CaptiveInsuranceModel
+
+# Sweepable parameters, in the axis order of the result cube
+SWEEP_PARAMETERS = ('num_gcs', 'premium_per_gc_annual', 'investment_return_rate', 'initial_capital')
+
+# Final-capital quantiles reported per grid point
+DEFAULT_QUANTILES = (0.005, 0.05, 0.5, 0.95)
+
+class SweepResult:
+    """
+    Metrics over a parameter grid, each an array shaped like the grid
+    (num_gcs x premium_per_gc_annual x investment_return_rate x initial_capital).
+    Index with a metric name for a heatmap-ready array; to_frame() gives one row per point.
+    """
+
+    def __init__(self, axes: Dict[str, np.ndarray], metrics: Dict[str, np.ndarray],
+                 num_simulations: int, years: int):
+        self.axes = axes
+        self.metrics = metrics
+        self.num_simulations = num_simulations
+        self.years = years
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(len(values) for values in self.axes.values())
+
+    def __getitem__(self, metric: str) -> np.ndarray:
+        return self.metrics[metric]
+
+    def squeeze(self, metric: str) -> np.ndarray:
+        """Metric array without the axes that hold a single value (e.g. premium x capital)."""
+        return self.metrics[metric].squeeze()
+
+    def to_frame(self) -> 'pd.DataFrame':
+        """Tidy DataFrame: one row per grid point, one column per parameter and metric."""
+        import pandas as pd
+        grid = np.meshgrid(*self.axes.values(), indexing='ij')
+        columns = {name: values.reshape(-1) for name, values in zip(self.axes, grid)}
+        columns.update({name: values.reshape(-1) for name, values in self.metrics.items()})
+        return pd.DataFrame(columns)
+
+def quantile_name(q: float) -> str:
+    """Metric name of a final-capital quantile, e.g. 0.005 -> 'capital_p0.5'."""
+    return f"capital_p{q * 100:g}"
+
+def _uses_model_draws(model: 'CaptiveInsuranceModel', axes: Dict[str, np.ndarray]) -> bool:
+    # Without a roster-size sweep, claims come from the model itself (including
+    # table-driven and queue-coupled claims)
+    return set(axes['num_gcs'].tolist()) == {model.num_gcs}
+
+def _claims_by_roster_size(model: 'CaptiveInsuranceModel', axes: Dict[str, np.ndarray], sizes: Sequence[int],
+                           num_simulations: int, years: int, seed: int,
+                           chunk_size: int) -> Dict[int, np.ndarray]:
+    """
+    Claim totals shaped (simulations, years) for the given roster sizes, from the draws
+    shared by the whole grid: per GC for the grid's largest roster, or the model's own
+    _draw_claims when the grid keeps the model's roster size.
+    """
+    totals = {size: [] for size in sizes}
+    for _, size, seed_seq in plan_chunks(num_simulations, chunk_size, seed):
+        rng = np.random.default_rng(seed_seq)
+        if _uses_model_draws(model, axes):
+            totals[model.num_gcs].append(model._draw_claims(size, years, rng)[0])
+            continue
+        shape = (size, years, int(axes['num_gcs'].max()))
+        has_claim = rng.random(shape) < model.claim_probability
+        severity = rng.normal(model.claim_severity_mean, model.claim_severity_std, shape)
+        np.maximum(severity, 0, out=severity)
+        severity *= has_claim
+        # Running total over GCs: the first n GCs' claims for every roster size n
+        by_roster = np.cumsum(severity, axis=2)
+        for num_gcs in sizes:
+            totals[num_gcs].append(by_roster[:, :, num_gcs - 1])
+    return {num_gcs: np.concatenate(chunks) for num_gcs, chunks in totals.items()}
+
+def _sweep_block(model: 'CaptiveInsuranceModel', points: List[Tuple[int, int]], axes: Dict[str, np.ndarray],
+                 num_simulations: int, years: int, seed: int, chunk_size: int,
+                 quantiles: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    Worker: evaluate the (num_gcs index, investment rate index) points of the grid over
+    every premium and initial capital. Each worker regenerates the shared draws from the
+    seed, so all workers see the same claims.
+
+    :return: Metric name -> (points, premiums, capitals) array
+    """
+    premiums, capitals = axes['premium_per_gc_annual'], axes['initial_capital']
+    sizes = sorted({int(axes['num_gcs'][g]) for g, _ in points})
+    claims = _claims_by_roster_size(model, axes, sizes, num_simulations, years, seed, chunk_size)
+    instrumentation.count('mc.claim_streams', num_simulations)
+
+    shape = (len(points), len(premiums), len(capitals))
+    metrics = {name: np.empty(shape) for name in
+               ['ruin_probability', 'mean_final_capital', 'mean_solvency_ratio',
+                *(quantile_name(q) for q in quantiles)]}
+    rows = np.arange(num_simulations)
+    last_year = np.full(num_simulations, years - 1)
+
+    with instrumentation.timer('mc.sweep'):
+        for point, (g, r) in enumerate(points):
+            num_gcs, rate = int(axes['num_gcs'][g]), float(axes['investment_return_rate'][r])
+            growth = (1 + rate) ** np.arange(1, years + 1)
+            discounted_claims = np.cumsum(claims[num_gcs] / growth, axis=1)
+            annuity = np.cumsum(1 / growth)
+            if _uses_model_draws(model, axes):
+                expected_annual_claims = model.expected_annual_claims
+            else:
+                expected_annual_claims = num_gcs * model.claim_probability * model.claim_severity_mean
+
+            for p, premium in enumerate(premiums):
+                # Ruined in year t exactly when initial capital <= shortfall[t]
+                shortfall = discounted_claims - 0.90 * num_gcs * premium * annuity
+                worst = np.sort(shortfall.max(axis=1))
+                ruined_paths = num_simulations - np.searchsorted(worst, capitals, side='left')
+                metrics['ruin_probability'][point, p] = ruined_paths / num_simulations
+
+                for c, capital in enumerate(capitals):
+                    # Ruin is absorbing: final capital is the capital in the first ruined year
+                    ruined = shortfall >= capital
+                    year = np.where(ruined.any(axis=1), ruined.argmax(axis=1), last_year)
+                    final_capital = growth[year] * (capital - shortfall[rows, year])
+
+                    metrics['mean_final_capital'][point, p, c] = final_capital.mean()
+                    metrics['mean_solvency_ratio'][point, p, c] = (final_capital.mean() / expected_annual_claims
+                                                                   if expected_annual_claims > 0 else 0.0)
+                    for q, value in zip(quantiles, np.quantile(final_capital, quantiles)):
+                        metrics[quantile_name(q)][point, p, c] = value
+    return metrics
+
+def sweep(model: 'CaptiveInsuranceModel',
+          grid: Dict[str, Sequence],
+          num_simulations: int = 10_000,
+          years: int = 10,
+          seed: int = None,
+          workers: int = 1,
+          quantiles: Sequence[float] = DEFAULT_QUANTILES,
+          chunk_size: int = 20_000) -> SweepResult:
+    """
+    Evaluate the model at every point of a parameter grid, with shared claim draws.
+
+    :param model: Model supplying the claim distribution and any parameter not in the grid
+    :param grid: Parameter name (from SWEEP_PARAMETERS) -> values to sweep
+    :param num_simulations: Claim streams shared by every grid point
+    :param years: Planning horizon
+    :param seed: Optional seed for reproducible runs
+    :param workers: Number of worker processes (grid points are split between them)
+    :param quantiles: Final-capital quantiles to report
+    :param chunk_size: Simulations drawn at once, to bound memory
+    :return: SweepResult with ruin_probability, mean_final_capital, mean_solvency_ratio
+             and capital quantile arrays shaped like the grid
+    """
+    unknown = set(grid) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Cannot sweep {sorted(unknown)}. Choose from {SWEEP_PARAMETERS}")
+    axes = {name: np.asarray(grid.get(name, [getattr(model, name)]), dtype=float if name != 'num_gcs' else int)
+            for name in SWEEP_PARAMETERS}
+    if (axes['num_gcs'] < 1).any():
+        raise ValueError("num_gcs values must be positive")
+    if model.scenario_generator is not None:
+        raise ValueError("Sweeps use the model's constant investment rate; clear scenario_generator first")
+    custom_claims = model.claim_tables is not None or model.claim_surrogate is not None
+    if custom_claims and set(axes['num_gcs'].tolist()) != {model.num_gcs}:
+        raise ValueError("Table-driven and queue-coupled models fix num_gcs to their roster")
+
+    points = [(g, r) for g in range(len(axes['num_gcs'])) for r in range(len(axes['investment_return_rate']))]
+    if workers is None or workers < 1:
+        workers = os.cpu_count() or 1
+    # Contiguous blocks, so each worker draws claims for as few roster sizes as possible
+    blocks = [block.tolist() for block in np.array_split(np.arange(len(points)), min(workers, len(points)))]
+    tasks = [([points[i] for i in block], axes, num_simulations, years, seed, chunk_size, quantiles)
+             for block in blocks]
+
+    if len(tasks) == 1:
+        outputs = [_sweep_block(model, *tasks[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(tasks)) as pool:
+            outputs = instrumentation.pool_map(pool, _sweep_block, [model] * len(tasks), *zip(*tasks))
+
+    shape = tuple(len(values) for values in axes.values())
+    metrics = {}
+    for name in outputs[0]:
+        # Blocks are in point order, and points run over (num_gcs, investment rate)
+        cube = np.concatenate([output[name] for output in outputs])
+        cube = cube.reshape(shape[0], shape[2], shape[1], shape[3])
+        metrics[name] = cube.transpose(0, 2, 1, 3)
+    return SweepResult(axes, metrics, num_simulations, years)
+
+if __name__ == "__main__":
+    import time
+    from risk_model import CaptiveInsuranceModel
+
+    model = CaptiveInsuranceModel(initial_capital=1_000_000, num_gcs=12, premium_per_gc_annual=50_000)
+    grid = {
+        'premium_per_gc_annual': np.arange(3_000, 6_001, 500),
+        'initial_capital': [50_000, 100_000, 150_000, 250_000, 500_000]
+    }
+    print("Sweeping premium x initial capital (10,000 shared claim streams, 10 years)...")
+    print("=" * 60)
+    start = time.perf_counter()
+    result = sweep(model, grid, num_simulations=10_000, years=10, seed=0)
+    print(f"{np.prod(result.shape)} grid points in {time.perf_counter() - start:.2f}s\n")
+
+    ruin = result.squeeze('ruin_probability')
+    print("Probability of ruin (rows: premium per GC, columns: initial capital)")
+    print(" " * 10 + "".join(f"{capital:>12,.0f}" for capital in result.axes['initial_capital']))
+    for premium, row in zip(result.axes['premium_per_gc_annual'], ruin):
+        print(f"{premium:>10,.0f}" + "".join(f"{value:>12.2%}" for value in row))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The simulation modules import each other by bare name from src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
@@ -0,0 +1,13 @@
+import pytest
+from actors import MarketType
+from queue_sim import run_simulation
+
+@pytest.mark.parametrize('backend', ['simpy', 'heap'])
+def test_unit_ids_unique_across_markets(backend):
+    results = run_simulation(simulation_days=365, units_per_market=60, seed=0, backend=backend)
+    completed = results['completed_units'].to_frame()
+
+    assert completed['unit_id'].is_unique
+    for code, market in enumerate(MarketType):
+        ids = completed.loc[completed['market'] == market, 'unit_id']
+        assert ids.between(code * 60, code * 60 + 59).all()
@@ -0,0 +1,21 @@
+import numpy as np
+from claim_tables import load_claim_tables
+from queue_coupling import QueueClaimSurrogate
+from risk_model import CaptiveInsuranceModel
+
+def test_from_queue_without_claim_events():
+    num_gcs = 6
+    claim_tables = load_claim_tables()
+    surrogate = QueueClaimSurrogate(
+        annual_counts=np.zeros((4, num_gcs), dtype=np.int64),
+        cell_counts=np.zeros((num_gcs, claim_tables.severity_mean.size), dtype=np.int64),
+        claim_tables=claim_tables,
+        gc_markets=np.arange(num_gcs) % claim_tables.severity_mean.shape[1]
+    )
+    model = CaptiveInsuranceModel.from_queue(surrogate, initial_capital=100_000, premium_per_gc_annual=1_000)
+
+    assert model.claim_probability == 0
+    assert model.claim_severity_mean == 0
+    assert model.expected_annual_claims == 0
+    summary = model.run_monte_carlo_streaming(num_simulations=100, years=5, seed=0)
+    assert summary.ruin_probability == 0
@@ -0,0 +1,26 @@
+import numpy as np
+from risk_model import CaptiveInsuranceModel
+from scenarios import EconomicScenarioGenerator, scenario
+
+def _model(investment_return_rate):
+    model = CaptiveInsuranceModel(initial_capital=150_000, num_gcs=12, premium_per_gc_annual=5_000)
+    model.investment_return_rate = investment_return_rate
+    return model
+
+def test_baseline_reproduces_constant_rate_model():
+    num_simulations = 20_000
+    model = _model(0.08)
+    plain = model.run_monte_carlo_streaming(num_simulations=num_simulations, years=10, seed=0)
+    model.scenario_generator = scenario('baseline')
+    baseline = model.run_monte_carlo_streaming(num_simulations=num_simulations, years=10, seed=0)
+
+    # Different random streams, same distribution: means agree within sampling noise
+    standard_error = plain.final_capital_std() * np.sqrt(2 / num_simulations)
+    assert abs(baseline.final_capital_mean - plain.final_capital_mean) < 4 * standard_error
+
+def test_returns_centre_on_model_rate():
+    rng = np.random.default_rng(0)
+    returns = EconomicScenarioGenerator(return_shift=-0.03).generate(10, 5, rng, base_return=0.08)
+    np.testing.assert_allclose(returns['investment_return'], 0.05)
+    returns = EconomicScenarioGenerator(return_mean=0.02).generate(10, 5, rng, base_return=0.08)
+    np.testing.assert_allclose(returns['investment_return'], 0.02)
@@ -5,6 +5,15 @@ Checks that Python 3.10 and all dependencies are properly installed.
 """
 import sys
 import subprocess
+import importlib.util
+
+# Import-time budgets for the entry points: module -> (milliseconds, heavy packages it must not load)
+IMPORT_BUDGETS = {
+    'main': (150, ['numpy', 'pandas', 'matplotlib', 'scipy', 'simpy']),
+    'risk_model': (400, ['pandas', 'scipy', 'matplotlib']),
+    'financial_instrument': (400, ['pandas', 'scipy', 'matplotlib']),
+    'queue_sim': (500, ['pandas', 'scipy', 'matplotlib'])
+}
 
 def check_python_version():
     """Verify Python 3.10 is being used."""
@@ -32,16 +41,17 @@ def check_dependencies():
         'numpy',
         'matplotlib',
         'simpy',
-        'scipy'
+        'scipy',
+        'pyarrow'
     ]
     
     missing = []
     
     for package in required_packages:
-        try:
-            __import__(package)
+        # find_spec locates the package without paying its import cost
+        if importlib.util.find_spec(package) is not None:
             print(f"✓ {package} installed")
-        except ImportError:
+        else:
             print(f"❌ {package} NOT installed")
             missing.append(package)
     
@@ -83,6 +93,38 @@ def check_file_structure():
     
     return all_exist
 
+def check_import_budget():
+    """Measure import time of the entry points and check heavy libraries stay lazy."""
+    print("\nChecking import times...")
+    
+    within_budget = True
+    
+    for module, (budget_ms, heavy_packages) in IMPORT_BUDGETS.items():
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd='src', capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"❌ import {module} failed")
+            within_budget = False
+            continue
+        
+        # -X importtime lines: "import time: self [us] | cumulative | imported package"
+        cumulative_us = {}
+        for line in result.stderr.splitlines():
+            fields = line.removeprefix('import time:').split('|')
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                cumulative_us[fields[2].strip()] = int(fields[1])
+        
+        elapsed_ms = cumulative_us.get(module, 0) / 1000
+        loaded = [package for package in heavy_packages if package in cumulative_us]
+        if elapsed_ms <= budget_ms and not loaded:
+            print(f"✓ {module}: {elapsed_ms:.0f} ms (budget {budget_ms} ms)")
+        else:
+            print(f"❌ {module}: {elapsed_ms:.0f} ms (budget {budget_ms} ms)"
+                  + (f", imports {', '.join(loaded)} eagerly" if loaded else ""))
+            within_budget = False
+    
+    return within_budget
+
 def main():
     """Run all verification checks."""
     print("="*60)
@@ -93,7 +135,8 @@ def main():
     checks = [
         ("Python Version", check_python_version),
         ("Dependencies", check_dependencies),
-        ("File Structure", check_file_structure)
+        ("File Structure", check_file_structure),
+        ("Import Time", check_import_budget)
     ]
     
     results = []